@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, date
+
+# Excel's day zero (1899-12-30 absorbs the 1900 leap-year bug)
+EXCEL_EPOCH = pd.Timestamp(1899, 12, 30)
+
+
+def date_to_excel_serial(dt):
+    if pd.isna(dt):
+        return None
+    base = EXCEL_EPOCH.date()
+
+    if isinstance(dt, datetime):
+        dt = dt.date()
+    elif isinstance(dt, pd.Timestamp):
+        dt = dt.to_pydatetime().date()
+    elif isinstance(dt, date):
+        pass
+    else:
+        return None
+
+    return (dt - base).days
+
+
+def excel_serials(dates):
+    """Whole-column version of date_to_excel_serial, as Int32 (<NA> where the date is missing)."""
+    dates = pd.to_datetime(dates, errors="coerce")
+    if getattr(dates.dt, "tz", None) is not None:
+        dates = dates.dt.tz_localize(None)
+    # Timedelta.days floors, so times of day are dropped like .date() does
+    return (dates - EXCEL_EPOCH).dt.days.astype("Int32")
+
+
+def add_ageing(df, as_of, date_column="Document_Date"):
+    """Add Doc_Serial and Doc_Ageing (days between the document date and as_of)."""
+    df["Doc_Serial"] = excel_serials(df[date_column])
+    df["Doc_Ageing"] = (date_to_excel_serial(as_of) - df["Doc_Serial"]).astype("Int32")
+    return df
+
+
+# Upper bounds (days, inclusive) of the Summary's ageing buckets; anything
+# older falls in a last open-ended bucket: 0-30, 31-60, 61-90, 91-180, 180+
+DEFAULT_BUCKETS = (30, 60, 90, 180)
+UNDATED = "Undated"
+
+
+def bucket_labels(edges=DEFAULT_BUCKETS):
+    lower = [0] + [edge + 1 for edge in edges[:-1]]
+    return [f"{low}-{high}" for low, high in zip(lower, edges)] + [f"{edges[-1]}+"]
+
+
+def bucket_criteria(label):
+    """Doc_Ageing conditions of a bucket label, as Excel criteria ("<=30", ">30", ...).
+
+    The inverse of bucket_labels, with ageing_buckets' bins: the first
+    bucket takes documents dated after the as-of date too, and UNDATED
+    matches empty cells.
+    """
+    if label == UNDATED:
+        return ["="]
+    if label.endswith("+"):
+        return [f">{int(label[:-1])}"]
+    low, high = (int(bound) for bound in label.split("-"))
+    return ([f">{low - 1}"] if low > 0 else []) + [f"<={high}"]
+
+
+def ageing_buckets(ageing, edges=DEFAULT_BUCKETS):
+    """Bucket label of every Doc_Ageing value, as one categorical column.
+
+    Documents dated after the as-of date count as 0-30; rows without a
+    date get UNDATED so their amounts still show up on the Summary.
+    """
+    bins = [-np.inf, *edges, np.inf]
+    buckets = pd.cut(ageing.astype("float64"), bins, labels=bucket_labels(edges))
+    return buckets.cat.add_categories([UNDATED]).fillna(UNDATED)
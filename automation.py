@@ -1,195 +1,717 @@
 import pandas as pd
 from datetime import datetime, date
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from itertools import repeat
+import argparse
+import cProfile
+import glob
+import importlib.util
 import openpyxl
-from openpyxl.styles import Border, Side, PatternFill, Font, Alignment
 import os
-
-def date_to_excel_serial(dt):
-    if pd.isna(dt):
-        return None
-    base = datetime(1899, 12, 30).date()
-    
-    if isinstance(dt, datetime):
-        dt = dt.date()
-    elif isinstance(dt, pd.Timestamp):
-        dt = dt.to_pydatetime().date()
-    elif isinstance(dt, date):
-        pass
+import pstats
+import re
+import sys
+import tempfile
+import zipfile
+from xml.etree import ElementTree
+from contextlib import ExitStack
+
+import chunked
+import incremental
+import instrument
+import money
+import movements
+import schema
+import styles
+
+from ageing import DEFAULT_BUCKETS, UNDATED, add_ageing, ageing_buckets
+from cache import DEFAULT_MAX_BYTES, ExportCache
+from history import SnapshotStore
+from ledger import LEDGER_ENGINES, LedgerStore, ledger_engine
+from layout import AGEING_MODES, account_text_lengths, summary_amounts
+import parallel
+from partition import iter_accounts
+from writers import WRITERS, stream_account_sheet, stream_movements, stream_summary
+
+#  Default input file and report name
+INPUT_FILE = os.path.join("data", "export.xls")
+OUTPUT_FILE = "Final Report.xlsx"
+# Spreadsheet exports picked up when --input is a directory
+EXPORT_PATTERNS = ("*.xls", "*.xlsx", "*.csv")
+# read_excel engines for --read-engine; "auto" is calamine when installed
+READ_ENGINES = ("auto", "calamine", "xlrd", "openpyxl")
+
+# Bump whenever normalize_export changes what it produces; cached exports
+# from older rules are then parsed again.
+NORMALIZE_VERSION = 8
+
+# Columns the report reads; everything else in the export is dropped at load
+REPORT_COLUMNS = list(schema.COLUMNS)
+# Few distinct values repeated on every row: stored as categoricals
+CATEGORY_COLUMNS = ["Comapany", "Account", "Document_Type", "Document_currency", "Local_Currency"]
+
+
+def load_export(input_file, cache=None, read_engine="auto"):
+    if cache is not None:
+        with instrument.stage("cache") as counts:
+            key = cache.key(input_file, NORMALIZE_VERSION)
+            df = cache.get(key)
+            counts["hits"] = int(df is not None)
+        if df is not None:
+            print("Data loaded from cache. Columns:", df.columns.tolist())
+            return df
+
+    # Open the workbook once: check its header (before any row is
+    # converted), then read only the report's columns
+    with instrument.stage("read") as counts:
+        if chunked.is_csv(input_file):
+            df = chunked.read_csv_export(input_file)
+        else:
+            with pd.ExcelFile(input_file, engine=excel_engine(input_file, read_engine)) as book:
+                with instrument.stage("probe"):
+                    headers = probe_export(book, input_file)
+                df = read_export(book, headers)
+        counts["rows"] = len(df)
+    with instrument.stage("normalize"):
+        df = normalize_export(df)
+    if cache is not None:
+        with instrument.stage("cache"):
+            cache.put(key, df)
+    return df
+
+
+def iter_aged_chunks(input_file, as_of, chunk_rows=chunked.DEFAULT_CHUNK_ROWS):
+    """Normalized, aged frames of up to chunk_rows rows of an export (see chunked.iter_chunks)."""
+    chunks = chunked.iter_chunks(input_file, chunk_rows)
+    while True:
+        with instrument.stage("read") as counts:
+            df = next(chunks, None)
+            if df is None:
+                return
+            counts["rows"] = len(df)
+        with instrument.stage("normalize"):
+            df = normalize_export(df)
+        with instrument.stage("ageing", rows=len(df)):
+            add_ageing(df, as_of)
+        yield df
+
+
+def load_chunked(input_file, as_of, chunk_rows=chunked.DEFAULT_CHUNK_ROWS,
+                 buckets=DEFAULT_BUCKETS, keep_rows=True):
+    """Read, normalize, age and summarize an export chunk by chunk.
+
+    Returns (df, sums, rows). The summary is kept as running totals, so
+    without keep_rows (df is then None) memory is bounded by one chunk and
+    the summary lines, whatever the size of the file. With keep_rows the
+    compact chunks are also gathered into df for the account sheets.
+    """
+    matrices, kept, rows = [], [], 0
+    for df in iter_aged_chunks(input_file, as_of, chunk_rows):
+        rows += len(df)
+        with instrument.stage("summary"):
+            matrices.append(summary_matrix(df, buckets))
+            # Fold the partial totals together now and then to bound memory
+            if len(matrices) >= 16:
+                matrices = [combine_summaries(matrices)]
+        if keep_rows:
+            kept.append(df)
+    if not matrices:
+        raise ValueError(f"{input_file} has no rows")
+
+    with instrument.stage("summary"):
+        sums = finish_summary(combine_summaries(matrices))
+    df = None
+    if keep_rows:
+        # Chunks' categoricals differ, so concatenation gives plain columns back
+        df = pd.concat(kept, ignore_index=True)
+        df = df.astype({name: "category" for name in CATEGORY_COLUMNS if name in df.columns})
+    return df, sums, rows
+
+
+def load_ledger(input_file, as_of, ledger, chunk_rows=chunked.DEFAULT_CHUNK_ROWS,
+                buckets=DEFAULT_BUCKETS):
+    """Stream an export chunk by chunk into a LedgerStore and summarize it there.
+
+    Returns (sums, rows); the account sheets then read their rows back
+    from the ledger, so no more than a chunk or an account is in memory.
+    """
+    for df in iter_aged_chunks(input_file, as_of, chunk_rows):
+        with instrument.stage("store", rows=len(df)):
+            ledger.append(df)
+    if not ledger.rows:
+        raise ValueError(f"{input_file} has no rows")
+    with instrument.stage("index"):
+        ledger.index()
+    with instrument.stage("summary") as counts:
+        sums = finish_summary(summary_matrix(ledger.summary_rows(buckets), buckets))
+        counts["rows"] = len(sums)
+    return sums, ledger.rows
+
+
+def excel_engine(input_file, read_engine="auto"):
+    """read_excel engine for an export.
+
+    "auto" prefers calamine (native, several times faster) when
+    python-calamine is installed, and otherwise falls back to xlrd for .xls
+    and openpyxl for everything else. All give the same normalized frame.
+    """
+    calamine = importlib.util.find_spec("python_calamine") is not None
+    if read_engine == "calamine" and not calamine:
+        raise ImportError("the calamine read engine needs the python-calamine package "
+                          "(pip install python-calamine)")
+    if read_engine != "auto":
+        return read_engine
+    if calamine:
+        return "calamine"
+    return "xlrd" if str(input_file).endswith(".xls") else "openpyxl"
+
+
+def probe_export(book, input_file):
+    """schema.probe of an export open as `book`, reading no more than the header row.
+
+    calamine parses a whole sheet even for nrows=0, so .xlsx files opened
+    with it whose sheet records its size (as Excel and xlsxwriter write
+    them) are probed with openpyxl's read-only reader instead, which then
+    stops after the header. Without a recorded size openpyxl reads the
+    whole sheet too, more slowly, so those and other engines probe the
+    open workbook itself.
+    """
+    if (book.engine == "calamine" and str(input_file).lower().endswith((".xlsx", ".xlsm"))
+            and _records_dimension(input_file)):
+        return schema.probe(input_file, engine="openpyxl", name=input_file)
+    return schema.probe(book, name=input_file)
+
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_RELS_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+
+def _records_dimension(path):
+    # Whether the first sheet's XML has a <dimension> range: only the
+    # workbook part, its relationships and the sheet's head are read
+    try:
+        with zipfile.ZipFile(path) as package:
+            sheet = ElementTree.fromstring(package.read("xl/workbook.xml")).find(
+                f"{_MAIN_NS}sheets/{_MAIN_NS}sheet")
+            rels = ElementTree.fromstring(package.read("xl/_rels/workbook.xml.rels"))
+            target = next(rel.get("Target") for rel in rels
+                          if rel.get("Id") == sheet.get(f"{_RELS_NS}id"))
+            part = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+            head = b""
+            with package.open(part) as xml:
+                # <dimension> comes before the rows
+                while b"<sheetData" not in head and len(head) < 2**16:
+                    block = xml.read(4096)
+                    if not block:
+                        break
+                    head += block
+    except (OSError, KeyError, StopIteration, AttributeError, zipfile.BadZipFile,
+            ElementTree.ParseError):
+        return False
+    dimension = re.search(rb'<(?:\w+:)?dimension\s+ref="([^"]*)"', head.split(b"<sheetData")[0])
+    return dimension is not None and b":" in dimension.group(1)
+
+
+def read_export(source, headers=None):
+    """Parse an export (a path or an open pd.ExcelFile).
+
+    Given its `headers` (from schema.probe), only the report's columns are
+    converted, with the types in schema.DTYPES, and dates come back as
+    datetime64.
+    """
+    options = schema.read_options(headers) if headers else {}
+    if not isinstance(source, pd.ExcelFile):
+        options["engine"] = excel_engine(source)
+    df = pd.read_excel(source, **options)
+    if headers:
+        for header, name in headers.items():
+            if name == "Document_Date":
+                df[header] = schema.parse_dates(df[header])
+
+    print("Data loaded. Columns:", df.columns.tolist())
+    return df
+
+
+def normalize_export(df, compact=True):
+    # Normalize column names, mapping known aliases ("Company") to the
+    # names used below ("Comapany")
+    df.columns = schema.column_names(df.columns)
+
+    # One Account type whatever the load path: numeric accounts as float64,
+    # which is what a whole export with its blank grand-total row gives
+    # (chunks, or exports without that row, would read them as int64)
+    if "Account" in df.columns and pd.api.types.is_numeric_dtype(df["Account"]):
+        df["Account"] = df["Account"].astype("float64")
+
+    # Parse document date if available (read_export may have done it already)
+    if "Document_Date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["Document_Date"]):
+        df["Document_Date"] = schema.parse_dates(df["Document_Date"])
+
+    if compact:
+        df = compact_dtypes(df)
+    return df
+
+
+def compact_dtypes(df):
+    """Keep only REPORT_COLUMNS, store the repetitive ones as categoricals and
+    amounts as int64 minor units of their currencies (see money.py).
+    """
+    df = df[[name for name in REPORT_COLUMNS if name in df.columns]]
+    df = df.astype({name: "category" for name in CATEGORY_COLUMNS if name in df.columns})
+    return money.minor_amounts(df)
+
+
+SUMMARY_KEYS = ["Comapany", "Account", "Document_currency", "Local_Currency"]
+
+
+def summarize(df, buckets=DEFAULT_BUCKETS):
+    """Amounts per company/account/currency pair, plus local amounts per ageing bucket.
+
+    Bucket columns (see ageing.bucket_labels) follow the two totals; an
+    "Undated" column is added only when some rows have no Document_Date.
+    No buckets: plain totals. Lines with no local amount are left out.
+    """
+    return finish_summary(summary_matrix(df, buckets))
+
+
+def summary_matrix(df, buckets=DEFAULT_BUCKETS):
+    """The summary before filtering, indexed by SUMMARY_KEYS.
+
+    One groupby over the rows gives the company x account x currency x
+    bucket matrix; the totals are its row sums. Matrices of separate
+    chunks of rows add up with combine_summaries.
+    """
+    if not buckets:
+        group = df.groupby(SUMMARY_KEYS, observed=True)
+        return group.agg({
+            "Amount_in_doc_curr": "sum",
+            "Amount_in_local_currency": "sum"
+        })
+
+    bucket = ageing_buckets(df["Doc_Ageing"], buckets).rename("Bucket")
+    matrix = (df.groupby(SUMMARY_KEYS + [bucket], observed=True)
+              [["Amount_in_doc_curr", "Amount_in_local_currency"]].sum()
+              .unstack("Bucket", fill_value=0))
+    labels = list(bucket.cat.categories)
+    if UNDATED not in matrix.columns.get_level_values("Bucket"):
+        labels.remove(UNDATED)
+    local = matrix["Amount_in_local_currency"].reindex(columns=labels, fill_value=0)
+    sums = pd.DataFrame({
+        "Amount_in_doc_curr": matrix["Amount_in_doc_curr"].sum(axis=1),
+        "Amount_in_local_currency": local.sum(axis=1),
+    }).join(local)
+    sums.columns = [str(name) for name in sums.columns]
+    return sums
+
+
+def combine_summaries(matrices):
+    """Add up summary matrices of separate chunks (a bucket missing from one counts as 0)."""
+    # Fill the gaps before concatenating, which would make them NaN and the
+    # integer amounts floats
+    columns = list(dict.fromkeys(name for matrix in matrices for name in matrix.columns))
+    combined = pd.concat([matrix.reindex(columns=columns, fill_value=0) for matrix in matrices])
+    return combined.groupby(level=SUMMARY_KEYS, sort=True).sum()
+
+
+def finish_summary(matrix):
+    sums = matrix.reset_index()
+    # Filter out zero local currency amounts (exactly zero: they are whole minor units)
+    return sums[sums["Amount_in_local_currency"] != 0]
+
+
+def build_report(df, today, output_file=OUTPUT_FILE, streaming=False,
+                 sort_by=None, ascending=True, workers=1, writer="openpyxl", ageing="static",
+                 buckets=DEFAULT_BUCKETS, sums=None, reuse_sheets=False, changes=None, ledger=None):
+    # `sums` may come precomputed (chunked loading), and df may then be None
+    # for a Summary-only report, or with the rows in a LedgerStore
+    # (--out-of-core). `changes` is (net, items, title) from --compare,
+    # written as a Movements sheet after the Summary.
+    today_str = today.strftime("%d.%m.%Y")
+    if ageing != "static" and buckets and df is None and ledger is None:
+        # Live bucket cells are formulas over the account sheets
+        raise ValueError("live ageing buckets need the account sheets; "
+                         "a Summary-only report has none")
+    if sums is None:
+        with instrument.stage("summary") as counts:
+            sums = summarize(df, buckets)
+            counts["rows"] = len(sums)
+    # Amounts are summed in minor units and only turned back into amounts here
+    sums = summary_amounts(sums)
+
+    if (workers > 1 or reuse_sheets) and df is not None:
+        return build_report_parallel(df, sums, today, output_file, sort_by, ascending, workers,
+                                     ageing, reuse_sheets, changes)
+
+    report = WRITERS[writer](output_file, streaming=streaming, ageing=ageing, as_of=today)
+    with instrument.stage("render") as counts:
+        report.write_summary(sums, today_str)
+        if changes is not None:
+            report.write_movements(*changes)
+
+        # Create per-account sheets; widths come from text lengths measured
+        # over all rows at once (the ledger's are measured sheet by sheet)
+        if ledger is not None:
+            accounts = ledger.iter_accounts(sort_by, ascending)
+            lengths = repeat(None)
+        elif df is not None:
+            accounts = iter_accounts(df, sort_by, ascending)
+            lengths = account_text_lengths(df)
+        else:
+            accounts, lengths = (), ()
+        for (account, account_df), account_lengths in zip(accounts, lengths):
+            report.write_account(account, account_df, account_lengths)
+            counts["sheets"] = counts.get("sheets", 0) + 1
+            counts["rows"] = counts.get("rows", 0) + len(account_df)
+
+    with instrument.stage("save"):
+        report.close()
+
+
+def build_report_parallel(df, sums, today, output_file, sort_by, ascending, workers, ageing,
+                          reuse_sheets=False, changes=None):
+    # Account sheets are rendered in worker processes (largest first) and
+    # spliced into the package in place of empty placeholder sheets. With
+    # `reuse_sheets` (--incremental), sheets whose content hash matches the manifest
+    # of the previous output are copied from that package instead.
+    accounts = list(iter_accounts(df, sort_by, ascending))
+    titles = [str(account) for account, _ in accounts]
+    cached, hashes = {}, None
+    if reuse_sheets:
+        with instrument.stage("hash", sheets=len(accounts)) as counts:
+            hashes = {title: incremental.account_hash(account_df, ageing, today)
+                      for title, (_, account_df) in zip(titles, accounts)}
+            cached = incremental.cached_sheets(output_file, incremental.load_manifest(output_file),
+                                               hashes)
+            counts["reused"] = len(cached)
+
+    with instrument.stage("render") as counts:
+        lengths = account_text_lengths(df)
+        jobs = [(account, (account_df, account_lengths), len(account_df))
+                for title, (account, account_df), account_lengths in zip(titles, accounts, lengths)
+                if title not in cached]
+        counts["sheets"], counts["rows"] = len(jobs), sum(job[2] for job in jobs)
+        render = partial(render_account, ageing=ageing)
+        rendered = iter(parallel.render_sheets(render, jobs, workers))
+        sheet_xml = [cached[title] if title in cached else next(rendered) for title in titles]
+
+        wb = openpyxl.Workbook(write_only=True)
+        registry = styles.StyleRegistry(wb)
+        stream_summary(wb, sums, today.strftime("%d.%m.%Y"), registry, ageing, today)
+        if changes is not None:
+            stream_movements(wb, *changes, registry)
+        first = len(wb.worksheets)
+        for title in titles:
+            wb.create_sheet(title=title)
+
+    with instrument.stage("save"):
+        parallel.save_with_sheets(wb, output_file, dict(enumerate(sheet_xml, start=first)))
+    if reuse_sheets:
+        parts = {title: f"xl/worksheets/sheet{i}.xml" for i, title in enumerate(titles, start=first + 1)}
+        incremental.write_manifest(output_file, hashes, parts)
+
+
+def render_account(wb, account, account_df, lengths, registry, ageing="static"):
+    # stream_account_sheet with its arguments in parallel.render_sheets' order
+    stream_account_sheet(wb, account, account_df, registry, ageing, lengths)
+
+
+def expand_inputs(patterns):
+    """Export files named by --input: files, directories of exports or glob patterns."""
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [path for ext in EXPORT_PATTERNS
+                       for path in glob.glob(os.path.join(pattern, ext))]
+        elif glob.has_magic(pattern):
+            matches = glob.glob(pattern)
+        else:
+            matches = [pattern]
+        files.extend(path for path in sorted(matches) if path not in files)
+    return files
+
+
+def output_path(input_file, output, batch):
+    # One input writes to --output itself; a batch writes one report per
+    # export into the --output directory.
+    if not batch:
+        return output
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(output, f"{stem} - {OUTPUT_FILE}")
+
+
+def run_report(input_file, output_file, as_of, cache=None, profile=False, trace_memory=False,
+               read_engine="auto", chunk_rows=None, summary_only=False, compare=None, history=None,
+               out_of_core=None, **options):
+    # Stage timings go to a JSON run report next to the workbook; --profile
+    # also dumps cProfile stats there for a closer look at the hot loops.
+    run = instrument.RunReport(trace_memory)
+    profiler = cProfile.Profile() if profile else None
+    with run.activate(), ExitStack() as scratch:
+        if profiler:
+            profiler.enable()
+        ledger = None
+        if out_of_core:
+            # The rows go to a database file that is removed after the run
+            directory = scratch.enter_context(tempfile.TemporaryDirectory(prefix="ageing-"))
+            ledger = scratch.enter_context(LedgerStore(os.path.join(directory, "ledger.db"),
+                                                       out_of_core))
+            sums, rows = load_ledger(input_file, as_of, ledger,
+                                     chunk_rows or chunked.DEFAULT_CHUNK_ROWS,
+                                     options.get("buckets", DEFAULT_BUCKETS))
+            df = None
+        elif chunk_rows:
+            buckets = options.get("buckets", DEFAULT_BUCKETS)
+            df, sums, rows = load_chunked(input_file, as_of, chunk_rows, buckets,
+                                          keep_rows=not summary_only)
+        else:
+            df = load_export(input_file, cache, read_engine)
+            rows = len(df)
+
+            # Add ageing column
+            with instrument.stage("ageing", rows=len(df)):
+                add_ageing(df, as_of)
+            sums = None
+
+        # Documents new, cleared or changed since an earlier export
+        changes = None
+        if compare:
+            with instrument.stage("compare"):
+                previous = load_export(compare, cache, read_engine)
+                items, net = movements.compare_exports(previous, df)
+            changes = (net, items, movements.movements_title(compare))
+
+        if (summary_only or history) and sums is None:
+            with instrument.stage("summary"):
+                sums = summarize(df, options.get("buckets", DEFAULT_BUCKETS))
+        if summary_only:
+            df = None
+
+        build_report(df, as_of, output_file, sums=sums, changes=changes,
+                     ledger=None if summary_only else ledger, **options)
+
+        # Keep the totals for trend queries (--trend)
+        if history:
+            with instrument.stage("history") as counts:
+                counts["rows"] = SnapshotStore(history).record(as_of, sums, input_file, rows)
+        if profiler:
+            profiler.disable()
+
+    if chunked.is_csv(input_file):
+        read_engine = "csv"
+    elif chunk_rows or out_of_core:
+        read_engine = "xlrd" if str(input_file).endswith(".xls") else "openpyxl"
     else:
-        return None
-    
-    return (dt - base).days
-
-
-#  Read input file
-input_file = r"E:\\dil_copies\\Document-Ageing-Report-\\data\\export.xls"
-
-if input_file.endswith(".xls"):
-    df = pd.read_excel(input_file, engine="xlrd")
-else:
-    df = pd.read_excel(input_file, engine="openpyxl")
-
-print("Data loaded. Columns:", df.columns.tolist())
-
-#print(df.columns)
-# print(df.head())
-
-# Normalize column names
-df.columns = (
-    df.columns
-    .str.replace(r"[ .]", "_", regex=True)  
-    .str.replace(r"_+", "_", regex=True)    
-    .str.strip("_")                       
-)
-
-# Parse document date if available
-if "Document_Date" in df.columns:
-    df["Document_Date"] = pd.to_datetime(df["Document_Date"], errors="coerce")
-
-
-today = datetime.now().date()
-today_str = today.strftime("%d.%m.%Y")
-today_serial = date_to_excel_serial(today)
-
-# Add ageing column
-df["Doc_Serial"] = df["Document_Date"].apply(date_to_excel_serial)
-df["Doc_Ageing"] = today_serial - df["Doc_Serial"]
-
-#  Create workbook & Summary sheet
-wb = openpyxl.Workbook()
-summary_ws = wb.active
-summary_ws.title = "Summary"
-summary_ws.sheet_view.showGridLines = False
-
-# Title
-summary_ws.cell(row=2, column=2).value = f"Document Ageing Report as at {today_str}"
-summary_ws.cell(row=2, column=2).font = Font(bold=True, size=14)
-
-# Headers
-summary_headers = [
-    "Company", "Account", "Document_currency", 
-    "Amount_in_doc_curr", "Local_Currency", "Amount_in_local_currency"
-]
-header_fill = PatternFill(start_color="ADD8E6", end_color="ADD8E6", fill_type="solid")
-
-thin_border = Border(
-    left=Side(style='thin'),
-    right=Side(style='thin'),
-    top=Side(style='thin'),
-    bottom=Side(style='thin')
-)
-
-header_alignment = Alignment(horizontal="center", vertical="center")
-center_bottom_align = Alignment(horizontal="center", vertical="bottom")
-
-for col, header in enumerate(summary_headers, start=2):
-    cell = summary_ws.cell(row=4, column=col)
-    cell.value = header
-    cell.fill = header_fill
-    cell.border = thin_border
-    cell.font = Font(bold=True)
-    cell.alignment = header_alignment
-
-#  summary content
-group = df.groupby(["Comapany", "Account", "Document_currency", "Local_Currency"])
-sums = group.agg({
-    "Amount_in_doc_curr": "sum",
-    "Amount_in_local_currency": "sum"
-}).reset_index()
-
-# Filter out zero local currency amounts
-sums = sums[abs(sums["Amount_in_local_currency"]) > 1e-5]
-
-#  data to summary
-for i, row in sums.iterrows():
-    r = i + 5
-    summary_ws.cell(row=r, column=2).value = row["Comapany"]
-    summary_ws.cell(row=r, column=3).value = row["Account"]
-    summary_ws.cell(row=r, column=4).value = row["Document_currency"]
-    summary_ws.cell(row=r, column=5).value = row["Amount_in_doc_curr"]
-    summary_ws.cell(row=r, column=6).value = row["Local_Currency"]
-    summary_ws.cell(row=r, column=7).value = row["Amount_in_local_currency"]
-
-    # Apply borders to each cell
-    for col in range(2, 8):
-        summary_ws.cell(row=r, column=col).border = thin_border
-
-    # Center + bottom align only for specified columns
-    summary_ws.cell(row=r, column=2).alignment = center_bottom_align  # Company
-    summary_ws.cell(row=r, column=4).alignment = center_bottom_align  # Document_currency
-    summary_ws.cell(row=r, column=6).alignment = center_bottom_align  # Local_Currency
-
-# Auto adjust column widths after filling
-def auto_adjust_column_width(ws):
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
+        read_engine = excel_engine(input_file, read_engine)
+    run_file = instrument.report_path(output_file)
+    run.write(run_file, input=os.fspath(input_file), output=os.fspath(output_file),
+              as_of=as_of.isoformat(), rows=rows, options=options, read_engine=read_engine,
+              chunk_rows=chunk_rows, summary_only=summary_only, compare=compare, history=history,
+              out_of_core=out_of_core and ledger_engine(out_of_core))
+    if profiler:
+        stats_file = os.path.splitext(run_file)[0] + ".prof"
+        profiler.dump_stats(stats_file)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+        print(f"Profile written to {stats_file} (open with python -m pstats)")
+    return rows, run.seconds("total")
+
+
+class _Inline:
+    """Stand-in for a process pool that runs each job immediately (--jobs 1)."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def print_trend(store, account, since=None):
+    trend = store.trend(account, since)
+    if trend.empty:
+        print(f"No history for account {account}")
+        return
+    print(f"Account {account}, local currency amounts by as-of date:")
+    with pd.option_context("display.width", None, "display.max_rows", None,
+                           "display.float_format", "{:,.2f}".format):
+        print(trend)
+
+
+def as_of_date(text):
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {text!r}") from None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the document ageing report.")
+    parser.add_argument("-i", "--input", nargs="+", default=[INPUT_FILE], metavar="PATH",
+                        help="export file(s), directories of exports or glob patterns "
+                             "(default: %(default)s)")
+    parser.add_argument("-o", "--output", metavar="PATH",
+                        help=f"report file, or the directory for one report per export when "
+                             f"several are given (default: {OUTPUT_FILE!r} / current directory)")
+    parser.add_argument("--as-of", type=as_of_date, metavar="YYYY-MM-DD",
+                        help="age documents as at this date instead of today")
+    parser.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+                        help="process up to N exports at once in separate processes")
+    parser.add_argument("--streaming", action="store_true",
+                        help="write sheets with openpyxl's write-only workbook "
+                             "(low memory for very large exports)")
+    parser.add_argument("--sort-by", metavar="COLUMN",
+                        help="order rows inside each account sheet by this column, e.g. Doc_Ageing")
+    parser.add_argument("--descending", action="store_true",
+                        help="sort --sort-by from largest to smallest")
+    parser.add_argument("--workers", type=int, default=1, metavar="N",
+                        help="render account sheets in N worker processes")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="keep parsed exports here and skip the Excel parse when "
+                             "the same file is reported again")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // 2**20, metavar="MB",
+                        help="evict least recently used cache entries beyond this size (default: %(default)s)")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="empty --cache-dir before loading")
+    parser.add_argument("--profile", action="store_true",
+                        help="run under cProfile, print the top entries and save the stats "
+                             "next to the report")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="add each stage's peak traced memory to the run report "
+                             "(tracemalloc; makes the run several times slower)")
+    parser.add_argument("--read-engine", choices=READ_ENGINES, default="auto",
+                        help="library that parses the export (default: calamine when "
+                             "python-calamine is installed, else xlrd/openpyxl)")
+    parser.add_argument("--chunk-rows", type=int, metavar="N",
+                        help="read the export N rows at a time (.xlsx with openpyxl's read-only "
+                             "mode, or .csv), adding up the Summary as it goes")
+    parser.add_argument("--summary-only", action="store_true",
+                        help="write only the Summary sheet; with --chunk-rows, memory then "
+                             "stays bounded whatever the export's size")
+    parser.add_argument("--incremental", action="store_true",
+                        help="keep a manifest of account sheet hashes next to the report and, "
+                             "on the next run, copy unchanged sheets from the previous report "
+                             "instead of rendering them again")
+    parser.add_argument("--out-of-core", nargs="?", const="auto", choices=LEDGER_ENGINES,
+                        metavar="ENGINE",
+                        help="for exports larger than memory: stream the rows into a temporary "
+                             "database (duckdb when installed, else sqlite) and build the summary "
+                             "and account sheets from queries; sheets are written in streaming mode")
+    parser.add_argument("--compare", metavar="PREVIOUS",
+                        help="add a Movements sheet with the documents that are new, cleared "
+                             "or changed amount since this earlier export, and the net change "
+                             "per account")
+    parser.add_argument("--history", metavar="DB",
+                        help="append each report's summary and ageing bucket totals to this "
+                             "SQLite database, by as-of date")
+    parser.add_argument("--trend", metavar="ACCOUNT",
+                        help="print ACCOUNT's balances per as-of date and bucket from --history "
+                             "instead of generating a report")
+    parser.add_argument("--since", type=as_of_date, metavar="YYYY-MM-DD",
+                        help="start --trend at this as-of date")
+    parser.add_argument("--writer", choices=sorted(WRITERS), default="openpyxl",
+                        help="xlsx library used to write the report (default: openpyxl)")
+    parser.add_argument("--buckets", type=int, nargs="*", default=list(DEFAULT_BUCKETS), metavar="DAYS",
+                        help="upper bounds of the Summary's ageing buckets, in days (default: "
+                             "%(default)s, i.e. 0-30 ... 180+); give none to leave them out")
+    parser.add_argument("--ageing", choices=AGEING_MODES, default="static",
+                        help="write Doc_Ageing as numbers (static), or as formulas against "
+                             "TODAY() or the as-of date cell on the Summary sheet (as-of), "
+                             "so the workbook stays current without regenerating it")
+    args = parser.parse_args(argv)
+    if args.workers > 1 and args.writer != "openpyxl":
+        parser.error("--workers is only supported with the openpyxl writer")
+    if args.workers > 1 and args.jobs > 1:
+        parser.error("use either --jobs or --workers, not both")
+    if args.incremental and args.writer != "openpyxl":
+        parser.error("--incremental is only supported with the openpyxl writer")
+    if args.compare and args.chunk_rows and args.summary_only:
+        parser.error("--compare needs the export's rows; drop --summary-only or --chunk-rows")
+    if args.out_of_core and (args.workers > 1 or args.incremental or args.compare or args.cache_dir):
+        parser.error("--out-of-core does not combine with --workers, --incremental, --compare "
+                     "or --cache-dir")
+    if args.summary_only and args.ageing != "static" and args.buckets:
+        parser.error("with --ageing today/as-of the Summary's buckets are formulas over the "
+                     "account sheets; drop --summary-only or give --buckets on its own")
+    if args.chunk_rows and args.cache_dir:
+        parser.error("--cache-dir does not apply to --chunk-rows")
+    if args.buckets != sorted(set(args.buckets)) or any(days < 0 for days in args.buckets):
+        parser.error("--buckets must be increasing day counts, e.g. 30 60 90 180")
+
+    if args.trend or args.since:
+        if not (args.trend and args.history):
+            parser.error("--trend needs --history (and --since needs --trend)")
+        print_trend(SnapshotStore(args.history), args.trend, args.since)
+        return
+
+    inputs = expand_inputs(args.input)
+    if not inputs:
+        parser.error(f"no exports found for {' '.join(args.input)}")
+    batch = len(inputs) > 1
+    output = args.output or ("." if batch else OUTPUT_FILE)
+    # Exports with the same file name in different directories would write
+    # one report over the other
+    outputs = {}
+    for input_file in inputs:
+        outputs.setdefault(output_path(input_file, output, batch), []).append(input_file)
+    clashes = [files for files in outputs.values() if len(files) > 1]
+    if clashes:
+        parser.error("these exports would write the same report; rename them or report them "
+                     "separately: " + "; ".join(", ".join(files) for files in clashes))
+    if batch:
+        os.makedirs(output, exist_ok=True)
+
+    cache = None
+    if args.cache_dir:
+        cache = ExportCache(args.cache_dir, args.cache_size * 2**20)
+        if args.clear_cache:
+            cache.invalidate()
+    elif args.clear_cache:
+        parser.error("--clear-cache needs --cache-dir")
+
+    as_of = args.as_of or datetime.now().date()
+    options = dict(streaming=args.streaming or bool(args.out_of_core), sort_by=args.sort_by,
+                   ascending=not args.descending, workers=args.workers, writer=args.writer,
+                   ageing=args.ageing, buckets=args.buckets, reuse_sheets=args.incremental)
+
+    with ProcessPoolExecutor(max_workers=args.jobs) if args.jobs > 1 else _Inline() as pool:
+        futures = []
+        for input_file in inputs:
+            output_file = output_path(input_file, output, batch)
+            future = pool.submit(run_report, input_file, output_file, as_of, cache,
+                                 args.profile, args.trace_memory, args.read_engine,
+                                 args.chunk_rows, args.summary_only, args.compare, args.history,
+                                 args.out_of_core, **options)
+            futures.append((input_file, output_file, future))
+
+        timings = []
+        for input_file, output_file, future in futures:
             try:
-                if cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-
-auto_adjust_column_width(summary_ws)
-
-# Create per-account sheets
-unique_accounts = df["Account"].unique()
-
-for account in unique_accounts:
-    account_df = df[df["Account"] == account].copy()
-    ws = wb.create_sheet(title=str(account))
-   
-
-    headers = [
-        "Company", "Account", "Document_Date", "Document_Type", "Text",
-        "Document_currency", "Amount_in_doc_curr", 
-        "Local_Currency", "Amount_in_local_currency", "Doc_Ageing"
-    ]
-
-    # Header row formatting
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=1, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.border = thin_border
-        cell.font = Font(bold=True)
-        cell.alignment = header_alignment
-
-    # Data rows
-    for idx, row in enumerate(account_df.itertuples(index=False), start=2):
-        row_dict = row._asdict()
-        ws.cell(row=idx, column=1).value = row_dict.get("Comapany")
-        ws.cell(row=idx, column=2).value = row_dict.get("Account")
-
-        doc_date = row_dict.get("Document_Date")
-        if pd.notna(doc_date):
-            ws.cell(row=idx, column=3).value = pd.to_datetime(doc_date).strftime("%d/%m/%Y")
+                rows, seconds = future.result()
+            except Exception as e:
+                print(f"❌ {input_file}: {e}", file=sys.stderr)
+                timings.append((input_file, None, None))
+                continue
+            print(f"✅ {output_file} generated successfully!")
+            timings.append((input_file, rows, seconds))
+
+    print("\nFile timings:")
+    for input_file, rows, seconds in timings:
+        if seconds is None:
+            print(f"  {input_file}: failed")
         else:
-            ws.cell(row=idx, column=3).value = None
-        ws.cell(row=idx, column=4).value = row_dict.get("Document_Type")
-        ws.cell(row=idx, column=5).value = row_dict.get("Text")
-        ws.cell(row=idx, column=6).value = row_dict.get("Document_currency")
-        ws.cell(row=idx, column=7).value = row_dict.get("Amount_in_doc_curr")
-        ws.cell(row=idx, column=8).value = row_dict.get("Local_Currency")
-        ws.cell(row=idx, column=9).value = row_dict.get("Amount_in_local_currency")
-        ws.cell(row=idx, column=10).value = row_dict.get("Doc_Ageing")
-
-        # Alignment:
-        ws.cell(row=idx, column=4).alignment = center_bottom_align
-        ws.cell(row=idx, column=6).alignment = center_bottom_align
-        ws.cell(row=idx, column=8).alignment = center_bottom_align
-        ws.cell(row=idx, column=10).alignment = center_bottom_align
-
-    # Totals row
-    total_row = len(account_df) + 2
-    ws.cell(row=total_row, column=7).value = account_df["Amount_in_doc_curr"].sum()
-    ws.cell(row=total_row, column=9).value = account_df["Amount_in_local_currency"].sum()
-
-    auto_adjust_column_width(ws)
-
-
-wb.save("Final Report.xlsx")
-print("✅ Final Report.xlsx generated successfully!")
+            print(f"  {input_file}: {rows} rows in {seconds:.2f}s")
+
+    if any(seconds is None for _, _, seconds in timings):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
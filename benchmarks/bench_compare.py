@@ -0,0 +1,59 @@
+"""Time of the export-to-export comparison behind --compare.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_compare [rows ...]
+
+A synthetic export (see benchmarks/synthetic.py) is compared with a copy
+of itself where the first 1% of documents have cleared, another 1% have
+changed amount, the next 1% were posted again as new documents and the
+rest are reordered. The counts found must match those edits; the script
+exits with status 1 when they do not.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from automation import normalize_export
+from benchmarks.synthetic import generate_export
+from movements import CHANGED, CLEARED, NEW, compare_exports
+
+
+def next_day(df, edits, seed=0):
+    rng = np.random.default_rng(seed)
+    today = df.iloc[edits:].copy()
+    changed = rng.choice(len(today), edits, replace=False)
+    # One minor unit (a cent): amounts are int64 minor units once loaded
+    today.iloc[changed, today.columns.get_loc("Amount_in_local_currency")] += 1
+    new = df.iloc[edits:2 * edits].copy()
+    new["Text"] = new["Text"].astype(object) + " (again)"
+    today = pd.concat([today, new])
+    return today.iloc[rng.permutation(len(today))]
+
+
+def main(argv=None):
+    sizes = [int(n) for n in (argv if argv is not None else sys.argv[1:])] or [100_000, 1_000_000]
+    failed = False
+    print(f"{'rows':>10} {'seconds':>8} {'new':>7} {'cleared':>8} {'changed':>8}")
+    for rows in sizes:
+        df = normalize_export(generate_export(rows, accounts=500, null_date_rate=0.02))
+        df = df[df["Account"].notna()].reset_index(drop=True)
+        edits = rows // 100
+        today = next_day(df, edits)
+
+        start = time.perf_counter()
+        items, _ = compare_exports(df, today)
+        seconds = time.perf_counter() - start
+        counts = items["Status"].value_counts()
+        print(f"{rows:>10} {seconds:>8.2f} {counts[NEW]:>7} {counts[CLEARED]:>8} {counts[CHANGED]:>8}")
+        failed |= [counts[NEW], counts[CLEARED], counts[CHANGED]] != [edits] * 3
+
+    if failed:
+        print("comparison counts do not match the edits", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
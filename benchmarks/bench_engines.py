@@ -0,0 +1,79 @@
+"""Load time and parity of each read engine on the same exports.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_engines [rows]
+
+Loads data/export.xls and a synthetic .xlsx of `rows` rows (see
+benchmarks/synthetic.py, with mixed-type Text and some real date cells)
+through load_export with every --read-engine that applies and is
+installed. Each frame must equal the one from the pure-Python fallback
+(xlrd for .xls, openpyxl for .xlsx); the script exits with status 1 when
+one does not. calamine needs python-calamine.
+"""
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from automation import load_export
+from benchmarks.synthetic import generate_export
+
+SAMPLE = os.path.join("data", "export.xls")
+
+
+def synthetic_export(rows, path):
+    df = generate_export(rows, null_date_rate=0.02, extra_columns=10)
+    # Exports mix numbers into Text and sometimes carry real date cells
+    df["Text"] = df["Text"].astype(object)
+    df.loc[::7, "Text"] = 12345
+    df["Document Date"] = df["Document Date"].astype(object)
+    df.loc[5::13, "Document Date"] = pd.Timestamp(2021, 3, 4)
+    # xlsxwriter writes shared strings and the sheet size, as Excel does
+    df.to_excel(path, index=False, engine="xlsxwriter")
+
+
+def timed_load(path, engine):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        df = load_export(path, read_engine=engine)
+    return df, time.perf_counter() - start
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    rows = int(argv[0]) if argv else 50_000
+    calamine = importlib.util.find_spec("python_calamine") is not None
+    if not calamine:
+        print("python-calamine is not installed; only the fallback engines are timed")
+
+    failed = False
+    print(f"{'export':>20} {'engine':>9} {'seconds':>8} {'parity':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic = os.path.join(tmp, f"synthetic_{rows}.xlsx")
+        synthetic_export(rows, synthetic)
+        for path, fallback in ((SAMPLE, "xlrd"), (synthetic, "openpyxl")):
+            reference, seconds = timed_load(path, fallback)
+            print(f"{os.path.basename(path):>20} {fallback:>9} {seconds:>8.2f} {'-':>7}")
+            if not calamine:
+                continue
+            df, seconds = timed_load(path, "calamine")
+            try:
+                pd.testing.assert_frame_equal(reference, df)
+                parity = "ok"
+            except AssertionError as e:
+                parity, failed = "DIFF", True
+                print(e, file=sys.stderr)
+            print(f"{os.path.basename(path):>20} {'calamine':>9} {seconds:>8.2f} {parity:>7}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Time and parity of --out-of-core against the in-memory report.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ledger [rows]
+
+data/export.xls, a synthetic .xlsx of `rows` rows (see
+benchmarks/synthetic.py) and a .csv of it whose first chunk has no Text
+at all are reported in memory and --out-of-core (in four chunks) with
+every ledger engine installed, with the default ageing buckets and with
+none (--buckets on its own). Every workbook must hold the same sheets and
+cell values as the in-memory one; the script exits with status 1 when
+one does not or a run fails. DuckDB stores Text as text, so a number in
+Text may come back as its string there. duckdb needs the duckdb package.
+"""
+import contextlib
+import importlib.util
+import io
+import math
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+import openpyxl
+
+from ageing import DEFAULT_BUCKETS
+from automation import run_report
+from benchmarks.synthetic import generate_export
+
+SAMPLE = os.path.join("data", "export.xls")
+AS_OF = date(2024, 12, 31)
+
+
+def sheet_values(path):
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return {ws.title: list(ws.iter_rows(values_only=True)) for ws in wb.worksheets}
+    finally:
+        wb.close()
+
+
+def same_value(a, b, text_as_string):
+    if a == b:
+        return True
+    if isinstance(a, float) and isinstance(b, float):
+        return math.isnan(a) and math.isnan(b)
+    # DuckDB's Text column: 898970 comes back as "898970"
+    return text_as_string and isinstance(b, str) and not isinstance(a, str) and str(a) == b
+
+
+def differences(expected, actual, text_as_string=False):
+    """Number of sheets or cells of `actual` that differ from `expected`."""
+    if list(expected) != list(actual):
+        return 1
+    count = 0
+    for title, rows in expected.items():
+        other = actual[title]
+        count += abs(len(rows) - len(other))
+        for row, other_row in zip(rows, other):
+            count += abs(len(row) - len(other_row))
+            count += sum(not same_value(a, b, text_as_string) for a, b in zip(row, other_row))
+    return count
+
+
+def timed_report(path, output, out_of_core, buckets, chunk_rows=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        run_report(path, output, AS_OF, chunk_rows=chunk_rows, out_of_core=out_of_core,
+                   streaming=True, buckets=buckets)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    rows = int(argv[0]) if argv else 20_000
+    engines = ["sqlite"]
+    if importlib.util.find_spec("duckdb") is not None:
+        engines.append("duckdb")
+    else:
+        print("duckdb is not installed; only the sqlite ledger is checked")
+
+    failed = False
+    print(f"{'export':>20} {'buckets':>8} {'mode':>10} {'seconds':>8} {'parity':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        export = generate_export(rows, accounts=200, null_date_rate=0.02)
+        synthetic = os.path.join(tmp, f"synthetic_{rows}.xlsx")
+        export.to_excel(synthetic, index=False, engine="xlsxwriter")
+        # A column empty in the first chunk must not fix its type for the rest
+        chunk_rows = max(rows // 4, 1)
+        export["Text"] = export["Text"].astype(object)
+        export.loc[:chunk_rows - 1, "Text"] = None
+        blank_text = os.path.join(tmp, f"blank_text_{rows}.csv")
+        export.to_csv(blank_text, index=False)
+        for path in (SAMPLE, synthetic, blank_text):
+            for buckets in (list(DEFAULT_BUCKETS), []):
+                label = "default" if buckets else "none"
+                reference = os.path.join(tmp, "memory.xlsx")
+                seconds = timed_report(path, reference, None, buckets)
+                expected = sheet_values(reference)
+                print(f"{os.path.basename(path):>20} {label:>8} {'memory':>10} {seconds:>8.2f} {'-':>7}")
+                for engine in engines:
+                    output = os.path.join(tmp, f"{engine}.xlsx")
+                    try:
+                        seconds = timed_report(path, output, engine, buckets, chunk_rows)
+                    except Exception as e:
+                        print(f"{os.path.basename(path):>20} {label:>8} {engine:>10} failed: {e}")
+                        failed = True
+                        continue
+                    diffs = differences(expected, sheet_values(output), engine == "duckdb")
+                    parity = "ok" if not diffs else f"{diffs} DIFF"
+                    failed |= bool(diffs)
+                    print(f"{os.path.basename(path):>20} {label:>8} {engine:>10} {seconds:>8.2f} {parity:>7}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Frame size and groupby/partition time of the loose and compact dtype models.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_memory [rows ...]
+
+The loose model is what normalize_export produced before the compact one:
+every export column kept, strings as str/object, serials and ageing as
+float64. The compact model keeps REPORT_COLUMNS only, with categorical keys
+and Int32 serials. Both start from the same synthetic export (see
+benchmarks/synthetic.py); the summary and the per-account partition are
+timed on each.
+"""
+import sys
+import time
+from datetime import date
+
+from ageing import add_ageing
+from automation import normalize_export, summarize
+from benchmarks.synthetic import generate_export
+from partition import iter_accounts
+
+AS_OF = date(2024, 12, 31)
+
+
+def loose(raw):
+    df = normalize_export(raw.copy(), compact=False)
+    add_ageing(df, AS_OF)
+    df["Doc_Serial"] = df["Doc_Serial"].astype(float)
+    df["Doc_Ageing"] = df["Doc_Ageing"].astype(float)
+    return df
+
+
+def compact(raw):
+    return add_ageing(normalize_export(raw.copy()), AS_OF)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def measure(df):
+    return {
+        "mb": df.memory_usage(deep=True).sum() / 2**20,
+        "summary": timed(summarize, df),
+        "partition": timed(lambda: sum(len(part) for _, part in iter_accounts(df))),
+        "sorted": timed(lambda: sum(len(part) for _, part in iter_accounts(df, "Doc_Ageing"))),
+    }
+
+
+def main(argv=None):
+    sizes = [int(n) for n in (argv if argv is not None else sys.argv[1:])] or [100_000, 1_000_000]
+    print(f"{'rows':>10} {'model':>8} {'MB':>8} {'summary s':>10} {'partition s':>12} {'sorted s':>9}")
+    for rows in sizes:
+        raw = generate_export(rows, accounts=500, null_date_rate=0.02)
+        for name, build in (("loose", loose), ("compact", compact)):
+            m = measure(build(raw))
+            print(f"{rows:>10} {name:>8} {m['mb']:>8.1f} {m['summary']:>10.3f} "
+                  f"{m['partition']:>12.3f} {m['sorted']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
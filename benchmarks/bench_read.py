@@ -0,0 +1,87 @@
+"""Load time of an export read in full and read projected to the report's columns.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_read [rows] [extra columns ...]
+
+For each width, a synthetic export (see benchmarks/synthetic.py) with that
+many unused SAP-style columns is written once, then loaded both ways: the
+full read_excel with type inference followed by normalize_export, as
+before the schema probe, and load_export's way (one open workbook, header
+probe, read_export with usecols/dtype). Times are the best of three.
+
+This is not a parse-time saving: every engine decodes each row's cells
+whatever usecols says, so both ways take about as long, within noise
+either way. The projection is there for the loaded frame (unused columns
+never reach it, codes arrive as categoricals and dates in the export's
+format); the "change" column shows what it costs or saves in time.
+
+Exports are written with xlsxwriter when it is installed: like Excel, it
+records the sheet size and uses shared strings, which the readers rely on
+to be fast. openpyxl's write-only files have neither and would make both
+ways look far slower than real exports.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from automation import excel_engine, normalize_export, probe_export, read_export
+from benchmarks.synthetic import generate_export, write_export
+
+REPEAT = 3
+
+
+def full_read(path):
+    return normalize_export(read_export(path))
+
+
+def projected_read(path):
+    with pd.ExcelFile(path, engine=excel_engine(path)) as book:
+        headers = probe_export(book, path)
+        return normalize_export(read_export(book, headers))
+
+
+def save(df, path):
+    try:
+        df.to_excel(path, index=False, engine="xlsxwriter")
+    except ImportError:
+        write_export(df, path)
+
+
+def best(fn, path):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn(path)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    rows = int(argv[0]) if argv else 20_000
+    widths = [int(n) for n in argv[1:]] or [0, 20, 60]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for extra in widths:
+            path = os.path.join(tmp, f"export_{extra}.xlsx")
+            save(generate_export(rows, extra_columns=extra), path)
+            # read_export prints the columns it loaded; keep the table readable
+            with open(os.devnull, "w") as devnull:
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    results.append((extra, best(full_read, path), best(projected_read, path)))
+                finally:
+                    sys.stdout = stdout
+
+    print(f"{'columns':>8} {'full s':>8} {'projected s':>12} {'change':>7}")
+    for extra, full, projected in results:
+        print(f"{11 + extra:>8} {full:>8.2f} {projected:>12.2f} {projected / full - 1:>+7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Render time of the old account-sheet writer vs the current one.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_styles [copies]
+
+The old writer styles cells attribute by attribute and rescans the sheet
+for column widths; the current one uses the named-style registry and
+widths taken from the data. The sample export is repeated `copies` times
+so the account sheets get large enough for the difference to show.
+"""
+import sys
+import time
+from datetime import date
+
+import openpyxl
+import pandas as pd
+from openpyxl.styles import Font
+
+import styles
+from ageing import add_ageing
+from automation import load_export
+from layout import ACCOUNT_CENTERED, ACCOUNT_HEADERS, ACCOUNT_TOTALS, account_columns
+from partition import iter_accounts
+from writers import write_account_sheet
+
+
+def auto_adjust_column_width(ws):
+    # The old width pass: a second walk over every cell of the finished sheet
+    for col in ws.columns:
+        max_length = 0
+        column = col[0].column_letter
+        for cell in col:
+            try:
+                if cell.value:
+                    max_length = max(max_length, len(str(cell.value)))
+            except:
+                pass
+        adjusted_width = (max_length + 2)
+        ws.column_dimensions[column].width = adjusted_width
+
+
+def legacy_account_sheet(ws, account_df):
+    # Rendering as automation.py did it before the registry: a fresh Font and
+    # four attribute assignments per header cell, one per centered body cell,
+    # and widths from a rescan of the finished sheet.
+    for col, header in enumerate(ACCOUNT_HEADERS, start=1):
+        cell = ws.cell(row=1, column=col)
+        cell.value = header
+        cell.fill = styles.header_fill
+        cell.border = styles.thin_border
+        cell.font = Font(bold=True)
+        cell.alignment = styles.header_alignment
+
+    for idx, row in enumerate(zip(*account_columns(account_df)), start=2):
+        for col, value in enumerate(row, start=1):
+            ws.cell(row=idx, column=col).value = value
+        for col in ACCOUNT_CENTERED:
+            ws.cell(row=idx, column=col).alignment = styles.center_bottom_align
+
+    total_row = len(account_df) + 2
+    for col, name in ACCOUNT_TOTALS.items():
+        ws.cell(row=total_row, column=col).value = account_df[name].sum()
+
+    auto_adjust_column_width(ws)
+
+
+def render(sheet_writer):
+    wb = openpyxl.Workbook()
+    start = time.perf_counter()
+    sheet_writer(wb)
+    return time.perf_counter() - start
+
+
+def main(copies=20):
+    df = load_export("data/export.xls")
+    df = pd.concat([df] * copies, ignore_index=True)
+    add_ageing(df, date.today())
+    print(f"{len(df)} rows")
+
+    accounts = list(iter_accounts(df))
+
+    def legacy_sheets(wb):
+        for account, account_df in accounts:
+            legacy_account_sheet(wb.create_sheet(title=str(account)), account_df)
+
+    def named_sheets(wb):
+        registry = styles.StyleRegistry(wb)
+        for account, account_df in accounts:
+            write_account_sheet(wb.create_sheet(title=str(account)), account_df, registry)
+
+    legacy = render(legacy_sheets)
+    named = render(named_sheets)
+    print(f"old writer:     {legacy:.2f}s")
+    print(f"current writer: {named:.2f}s ({legacy / named:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,63 @@
+"""Time of the account sheets' column widths on ledgers with many small accounts.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_widths [rows] [accounts ...]
+
+For each account count, a synthetic export (see benchmarks/synthetic.py)
+is loaded and the widths of every account sheet are worked out twice:
+measured sheet by sheet from each account's columns (what the ledger
+path of --out-of-core still does), and from account_text_lengths, which
+measures the whole frame once and takes the longest per account with one
+groupby. Both must give the same widths; the script exits with status 1
+when they do not.
+"""
+import sys
+import time
+from datetime import date
+
+from ageing import add_ageing
+from automation import normalize_export
+from benchmarks.synthetic import generate_export
+from layout import account_columns, account_text_lengths, account_totals, account_widths
+from partition import iter_accounts
+
+
+def per_sheet(df, sheets):
+    return [account_widths(columns, totals) for columns, totals in sheets]
+
+
+def whole_frame(df, sheets):
+    return [account_widths(None, totals, lengths)
+            for (_, totals), lengths in zip(sheets, account_text_lengths(df))]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    rows = int(argv[0]) if argv else 20_000
+    counts = [int(n) for n in argv[1:]] or [100, 1000, 5000]
+
+    failed = False
+    print(f"{'accounts':>9} {'sheets':>7} {'per sheet s':>12} {'whole frame s':>14}")
+    for accounts in counts:
+        df = normalize_export(generate_export(rows, accounts=accounts, null_date_rate=0.02))
+        add_ageing(df, date(2024, 12, 31))
+        # Sheet values and totals are needed for writing either way: not timed
+        sheets = [(account_columns(account_df), account_totals(account_df))
+                  for _, account_df in iter_accounts(df)]
+        times = []
+        for fn in (per_sheet, whole_frame):
+            start = time.perf_counter()
+            widths = fn(df, sheets)
+            times.append((time.perf_counter() - start, widths))
+        (slow, expected), (fast, widths) = times
+        print(f"{accounts:>9} {len(widths):>7} {slow:>12.2f} {fast:>14.2f}")
+        failed |= widths != expected
+
+    if failed:
+        print("widths differ between the two ways", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Wall time and peak RSS of each report writer on the same export.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_writers [copies]
+
+Every backend runs in a fresh interpreter so peak RSS is not shared. The
+sample export is repeated `copies` times; loading it is excluded from the
+wall time but part of the peak RSS, so the "render" column (peak growth
+after loading) is the number to compare. Peak RSS needs the Unix
+`resource` module.
+"""
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from ageing import add_ageing
+from automation import build_report, load_export
+
+# (label, writer, streaming)
+BACKENDS = [
+    ("openpyxl", "openpyxl", False),
+    ("openpyxl --streaming", "openpyxl", True),
+    ("xlsxwriter", "xlsxwriter", False),
+]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_backend(writer, streaming, copies):
+    df = load_export("data/export.xls")
+    df = pd.concat([df] * copies, ignore_index=True)
+    add_ageing(df, date.today())
+    loaded = peak_rss_mb()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        build_report(df, date.today(), Path(tmp) / "report.xlsx", streaming=streaming, writer=writer)
+        seconds = time.perf_counter() - start
+
+    peak = peak_rss_mb()
+    return {"rows": len(df), "seconds": seconds, "peak_mb": peak, "render_mb": peak - loaded}
+
+
+def main(copies=20):
+    for label, writer, streaming in BACKENDS:
+        child = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_writers", "--child", writer, str(int(streaming)), str(copies)],
+            capture_output=True, text=True,
+        )
+        if child.returncode:
+            print(f"{label:22} failed: {child.stderr.strip().splitlines()[-1]}")
+            continue
+        result = json.loads(child.stdout.splitlines()[-1])
+        print(f"{label:22} {result['rows']} rows  {result['seconds']:6.2f}s  "
+              f"peak {result['peak_mb']:7.1f} MB  render {result['render_mb']:7.1f} MB")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        writer, streaming, copies = sys.argv[2], bool(int(sys.argv[3])), int(sys.argv[4])
+        print(json.dumps(run_backend(writer, streaming, copies)))
+    else:
+        main(*map(int, sys.argv[1:]))
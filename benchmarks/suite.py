@@ -0,0 +1,113 @@
+"""Stage timings of the report pipeline on synthetic exports of growing size.
+
+Run from the repository root:
+
+    python -m benchmarks.suite --rows 10000 100000 --accounts 200
+    python -m benchmarks.suite --rows 10000 100000 --accounts 200 --record
+
+Each size gets a generated export (see benchmarks/synthetic.py) that goes
+through the same stages as automation.py: read, normalize, ageing, summary
+groupby, per-account render, column widths and save. --record stores the
+timings as the baseline; later runs print each stage against it and flag
+stages that got more than 20% slower. Sizes beyond Excel's row limit skip
+the read stage and start from the generated frame.
+"""
+import argparse
+import json
+import os
+import tempfile
+from datetime import date
+
+import instrument
+import writers
+from ageing import add_ageing
+from automation import build_report, normalize_export, read_export
+from benchmarks.synthetic import MAX_XLSX_ROWS, generate_export, write_export
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+STAGES = ["read", "normalize", "ageing", "summary", "render", "widths", "save"]
+AS_OF = date(2024, 12, 31)
+REGRESSION = 1.2
+
+
+def run_scenario(rows, accounts, null_date_rate, writer, streaming, tmp):
+    raw = generate_export(rows, accounts, null_date_rate=null_date_rate)
+    export = os.path.join(tmp, f"export_{rows}_{accounts}.xlsx")
+    if rows <= MAX_XLSX_ROWS and not os.path.exists(export):
+        write_export(raw, export)
+
+    # The same stages automation.py records in its run report
+    run = instrument.RunReport()
+    with run.activate():
+        if rows <= MAX_XLSX_ROWS:
+            with instrument.stage("read"):
+                raw = read_export(export)
+        with instrument.stage("normalize"):
+            df = normalize_export(raw)
+        with instrument.stage("ageing"):
+            add_ageing(df, AS_OF)
+        build_report(df, AS_OF, os.path.join(tmp, "report.xlsx"), streaming=streaming, writer=writer)
+
+    seconds = {stage: run.seconds(stage) for stage in STAGES if stage in run.stages}
+    # Widths are worked out inside the render stage
+    seconds["widths"] = run.seconds("render.widths")
+    seconds["render"] -= seconds["widths"]
+    return seconds
+
+
+def print_table(results, baseline):
+    print(f"{'scenario':>16} " + " ".join(f"{s:>10}" for s in STAGES) + f" {'total':>10}")
+    for name, seconds in results.items():
+        cells = []
+        for stage in STAGES + ["total"]:
+            value = sum(seconds.values()) if stage == "total" else seconds.get(stage)
+            if value is None:
+                cells.append(f"{'-':>10}")
+                continue
+            cell = f"{value:.2f}"
+            before = baseline.get(name, {})
+            before = sum(before.values()) if stage == "total" and before else before.get(stage)
+            if before:
+                ratio = value / before
+                cell += f"{'!' if ratio > REGRESSION else ' '}{ratio:.1f}x"
+            cells.append(f"{cell:>10}")
+        print(f"{name:>16} " + " ".join(cells))
+    if baseline:
+        print(f"\nNx = time relative to the baseline, ! = slower than {REGRESSION}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each report stage on synthetic exports.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--null-dates", type=float, default=0.02, metavar="RATE")
+    parser.add_argument("--writer", choices=sorted(writers.WRITERS), default="openpyxl")
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--baseline", default=BASELINE, metavar="FILE",
+                        help="timings to compare against (default: %(default)s)")
+    parser.add_argument("--record", action="store_true",
+                        help="save this run's timings as the baseline")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.record:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            name = f"{rows}x{args.accounts}"
+            results[name] = run_scenario(rows, args.accounts, args.null_dates,
+                                         args.writer, args.streaming, tmp)
+
+    print_table(results, baseline)
+
+    if args.record:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
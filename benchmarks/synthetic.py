@@ -0,0 +1,131 @@
+"""Synthetic ledger exports with the same columns as data/export.xls.
+
+    python -m benchmarks.synthetic --rows 100000 --accounts 500 exports/synthetic.xlsx
+
+Everything is drawn from a seeded generator, so the same arguments always
+give the same export.
+"""
+import argparse
+from datetime import date
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+# Excel's sheet limit, header row included
+MAX_XLSX_ROWS = 1_048_575
+
+DEFAULT_CURRENCIES = {"USD": 0.55, "LKR": 0.40, "EUR": 0.04, "HKD": 0.01}
+# Local-currency units per unit of document currency (rough, fixed)
+FX_RATES = {"USD": 1.0, "LKR": 300.0, "EUR": 1.1, "HKD": 0.13, "GBP": 1.27, "INR": 0.012}
+DOCUMENT_TYPES = ["FZ", "SA", "KR", "DR", "AB"]
+TEXTS = [
+    "PRCEEDS F PURCHEUSE F RECEVEUBLES", "CHEURGE WEUVED EUSCENEU GLBEUL",
+    "INTERCOMPANY SETTLEMENT", "FX REVALUATION", "ACCRUAL REVERSAL", "BANK CHARGES",
+]
+
+
+def generate_export(rows, accounts=100, companies=8, currencies=None, null_date_rate=0.0,
+                    as_of=date(2024, 12, 31), max_age_days=1500, seed=0, extra_columns=0):
+    """A raw export frame (column names as the ERP writes them).
+
+    `currencies` maps document currency codes to their share of rows; each
+    company books in one local currency drawn from the same mix.
+    `null_date_rate` is the share of rows without a Document Date.
+    `extra_columns` adds that many columns the report does not use, as wide
+    SAP layouts have (assignment, reference, posting key, ...).
+    """
+    rng = np.random.default_rng(seed)
+    currencies = currencies or DEFAULT_CURRENCIES
+    codes = np.array(list(currencies), dtype=object)
+    weights = np.array(list(currencies.values()), dtype=float)
+    weights /= weights.sum()
+    fx = np.array([FX_RATES.get(c, 1.0) for c in codes])
+
+    company_codes = np.array([f"CO{i:04d}" for i in range(companies)], dtype=object)
+    company_local = rng.choice(len(codes), size=companies, p=weights)
+    company = rng.integers(0, companies, rows)
+
+    account_numbers = 63010001.0 + np.arange(accounts)
+    # Skewed account sizes, like a real ledger (a few accounts hold most rows)
+    account = account_numbers[(rng.zipf(1.3, rows) - 1) % accounts]
+
+    doc_currency = rng.choice(len(codes), size=rows, p=weights)
+    local_currency = company_local[company]
+
+    amount = np.round(rng.normal(0, 50_000, rows), 2)
+    local_amount = np.round(amount * fx[doc_currency] / fx[local_currency], 2)
+
+    # Dates as the ERP writes them; each distinct day is formatted once
+    days = pd.date_range(end=pd.Timestamp(as_of), periods=max_age_days + 5, freq="D")
+    labels = np.array(days.strftime("%d.%m.%Y"), dtype=object)
+    periods = np.array(days.strftime("%Y/%m"), dtype=object)
+    doc_day = rng.integers(0, max_age_days, rows)
+    entry_day = doc_day + rng.integers(0, 5, rows)
+    doc_date = labels[doc_day]
+    doc_date[rng.random(rows) < null_date_rate] = None
+
+    df = pd.DataFrame({
+        "Comapany": company_codes[company],
+        "Account": account,
+        "Entry Date": labels[entry_day],
+        "Document Date": doc_date,
+        "Document Type": np.array(DOCUMENT_TYPES, dtype=object)[rng.integers(0, len(DOCUMENT_TYPES), rows)],
+        "Text": np.array(TEXTS, dtype=object)[rng.integers(0, len(TEXTS), rows)],
+        "Document currency": codes[doc_currency],
+        "Amount in doc. curr.": amount,
+        "Local Currency": codes[local_currency],
+        "Amount in local currency": local_amount,
+        "Year/month": periods[doc_day],
+    })
+    for i in range(extra_columns):
+        # Alternate text and number columns
+        if i % 2:
+            df[f"Field {i + 1}"] = np.round(rng.normal(0, 1000, rows), 2)
+        else:
+            df[f"Field {i + 1}"] = np.array([f"REF{n:07d}" for n in range(1000)], dtype=object)[
+                rng.integers(0, 1000, rows)]
+    return df
+
+
+def write_export(df, path):
+    """Save a generated export as .xlsx (write-only, so large frames stay cheap)."""
+    if len(df) > MAX_XLSX_ROWS:
+        raise ValueError(f"{len(df)} rows do not fit on one Excel sheet ({MAX_XLSX_ROWS} max)")
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False):
+        ws.append(row)
+    wb.save(path)
+
+
+def parse_currencies(text):
+    # "USD=0.6,LKR=0.4"
+    pairs = (item.split("=") for item in text.split(","))
+    return {code.strip(): float(share) for code, share in pairs}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", help=".xlsx file to write")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--companies", type=int, default=8)
+    parser.add_argument("--currencies", type=parse_currencies, metavar="CODE=SHARE,...",
+                        help="document currency mix, e.g. USD=0.6,LKR=0.4")
+    parser.add_argument("--null-dates", type=float, default=0.0, metavar="RATE",
+                        help="share of rows without a Document Date")
+    parser.add_argument("--extra-columns", type=int, default=0, metavar="N",
+                        help="add N columns the report does not use")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    df = generate_export(args.rows, args.accounts, args.companies, args.currencies,
+                         args.null_dates, seed=args.seed, extra_columns=args.extra_columns)
+    write_export(df, args.output)
+    print(f"{len(df)} rows written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
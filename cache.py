@@ -0,0 +1,80 @@
+import hashlib
+import os
+from pathlib import Path
+
+import pandas as pd
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class ExportCache:
+    """Parsed, normalized exports on disk, keyed by the input's bytes.
+
+    Entries are Feather files when pyarrow is installed and the frame fits
+    Arrow's types; mixed-type object columns (SAP text fields that are
+    sometimes numbers) fall back to a pickle so values round-trip exactly.
+    Least recently used entries are evicted once the directory grows past
+    max_bytes.
+    """
+
+    READERS = {".feather": pd.read_feather, ".pkl": pd.read_pickle}
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def key(self, input_file, version):
+        """Hash of the file contents plus the normalization rules version."""
+        digest = hashlib.sha256(f"v{version}:".encode())
+        with open(input_file, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _entries(self, key="*"):
+        return [path for suffix in self.READERS for path in self.directory.glob(key + suffix)]
+
+    def get(self, key):
+        for path in self._entries(key):
+            try:
+                df = self.READERS[path.suffix](path)
+            except Exception:
+                # Unreadable (truncated, or pyarrow went away): drop and re-parse
+                path.unlink(missing_ok=True)
+                continue
+            os.utime(path)  # mark as recently used
+            return df
+        return None
+
+    def put(self, key, df):
+        path = self.directory / (key + ".feather")
+        try:
+            self._write(df.to_feather, path)
+        except (ImportError, TypeError, ValueError):
+            # No pyarrow, or a column Arrow can't type (ArrowTypeError/ArrowInvalid)
+            self._write(df.to_pickle, path.with_suffix(".pkl"))
+        self.evict()
+
+    def _write(self, writer, path):
+        # Write beside the entry and rename, so readers never see half a file
+        tmp = path.with_name(path.name + ".tmp")
+        try:
+            writer(tmp)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        os.replace(tmp, path)
+
+    def invalidate(self, key=None):
+        """Remove one entry, or every entry when key is None."""
+        for path in self._entries(key or "*"):
+            path.unlink(missing_ok=True)
+
+    def evict(self):
+        entries = sorted(self._entries(), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in entries)
+        while entries and total > self.max_bytes:
+            oldest = entries.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink(missing_ok=True)
@@ -0,0 +1,79 @@
+import csv
+
+import openpyxl
+import pandas as pd
+
+import schema
+
+# Rows per chunk when reading an export piecewise
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def is_csv(path):
+    return str(path).lower().endswith(".csv")
+
+
+def csv_separator(path):
+    """Field separator of a CSV export, sniffed from its header line."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        header = f.readline()
+    try:
+        return csv.Sniffer().sniff(header, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+
+def read_csv_export(path, chunk_rows=None):
+    """A CSV export with only the report's columns (see schema.read_options).
+
+    With chunk_rows, an iterator of frames of up to that many rows instead.
+    """
+    sep = csv_separator(path)
+    header = pd.read_csv(path, sep=sep, nrows=0, encoding="utf-8-sig").columns.tolist()
+    headers = schema.resolve(header, source=str(path))
+    return pd.read_csv(path, sep=sep, encoding="utf-8-sig", chunksize=chunk_rows,
+                       **schema.read_options(headers))
+
+
+def iter_chunks(input_file, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Raw frames of up to chunk_rows rows, holding only the report's columns.
+
+    .xlsx sheets are walked with openpyxl's read-only iter_rows, so only one
+    chunk of cells is in memory at a time; CSV goes through read_csv's
+    chunksize. .xls has no streaming reader (xlrd loads whole workbooks, and
+    the format stops at 65,536 rows anyway), so it comes as a single chunk.
+    The header is checked against the schema before any row is read.
+    Chunks come raw; normalize_export gives them one Account type.
+    """
+    if is_csv(input_file):
+        yield from read_csv_export(input_file, chunk_rows)
+        return
+    if str(input_file).lower().endswith(".xls"):
+        with pd.ExcelFile(input_file, engine="xlrd") as book:
+            headers = schema.probe(book, name=input_file)
+            yield pd.read_excel(book, **schema.read_options(headers))
+        return
+
+    wb = openpyxl.load_workbook(input_file, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        headers = schema.resolve(header, source=str(input_file))
+        wanted = [(i, headers[name]) for i, name in enumerate(header) if headers[name] in schema.COLUMNS]
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunk_rows:
+                yield _chunk_frame(batch, wanted)
+                batch = []
+        if batch:
+            yield _chunk_frame(batch, wanted)
+    finally:
+        wb.close()
+
+
+def _chunk_frame(rows, wanted):
+    # Rows may be shorter than the header when trailing cells are empty
+    columns = {name: [row[i] if i < len(row) else None for row in rows] for i, name in wanted}
+    df = pd.DataFrame(columns)
+    return df.astype({name: schema.DTYPES[name] for name in df.columns if name in schema.DTYPES})
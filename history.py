@@ -0,0 +1,132 @@
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from layout import SUMMARY_COLUMNS, summary_amounts
+
+# Bucket of the summary line totals, next to the ageing buckets' labels
+TOTAL = "Total"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    as_of TEXT NOT NULL,
+    source TEXT NOT NULL,
+    recorded_at TEXT,
+    rows INTEGER,
+    PRIMARY KEY (as_of, source)
+);
+CREATE TABLE IF NOT EXISTS balances (
+    as_of TEXT NOT NULL,
+    source TEXT NOT NULL,
+    company TEXT,
+    account TEXT NOT NULL,
+    document_currency TEXT,
+    local_currency TEXT,
+    bucket TEXT NOT NULL,
+    amount_doc REAL,
+    amount_local REAL
+);
+CREATE INDEX IF NOT EXISTS balances_snapshot
+    ON balances (as_of, company, account, local_currency);
+CREATE INDEX IF NOT EXISTS balances_account
+    ON balances (account, bucket, as_of);
+"""
+
+
+def account_key(account):
+    """Account as stored: 63010001.0 (Excel's numbers) is kept as "63010001".
+
+    Text is read the same way, so --trend takes the account as the report's
+    sheet title shows it ("63010001.0") as well as "63010001". Only a zero
+    fraction is dropped; text accounts keep their leading zeros.
+    """
+    if isinstance(account, float) and account.is_integer():
+        return str(int(account))
+    whole = re.fullmatch(r"\s*([-+]?\d+)\.0*\s*", str(account))
+    return whole.group(1) if whole else str(account).strip()
+
+
+class SnapshotStore:
+    """Summary and ageing bucket totals of every run, in a SQLite database.
+
+    One snapshot per as-of date and export (its absolute path): recording
+    them again replaces it, while several exports for the same date (one
+    per company, say) add up. Each
+    summary line is stored once per bucket (TOTAL for the line's amounts,
+    then its local-currency amount in each ageing bucket), indexed so that
+    one account's history is a single index range.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # One transaction per call; concurrent --jobs runs take turns on the
+        # database's write lock
+        db = sqlite3.connect(self.path, timeout=60)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def record(self, as_of, sums, source, rows=None):
+        """Store a run's summary (summarize's frame) as the snapshot of `source` at as_of."""
+        day, source = as_of.isoformat(), os.path.abspath(source)
+        sums = summary_amounts(sums)
+        keys = pd.DataFrame({
+            "as_of": day,
+            "source": source,
+            "company": sums["Comapany"].astype(object),
+            "account": sums["Account"].map(account_key),
+            "document_currency": sums["Document_currency"].astype(object),
+            "local_currency": sums["Local_Currency"].astype(object),
+        })
+        buckets = [name for name in sums.columns if name not in SUMMARY_COLUMNS]
+        lines = [keys.assign(bucket=TOTAL, amount_doc=sums["Amount_in_doc_curr"],
+                             amount_local=sums["Amount_in_local_currency"])]
+        lines += [keys.assign(bucket=str(bucket), amount_doc=None, amount_local=sums[bucket])
+                  for bucket in buckets]
+        balances = pd.concat(lines, ignore_index=True).astype(object)
+        balances = balances.where(balances.notna(), None)
+
+        with self._connect() as db:
+            db.execute("DELETE FROM balances WHERE as_of = ? AND source = ?", (day, source))
+            db.executemany("INSERT INTO balances VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           balances.itertuples(index=False, name=None))
+            db.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)",
+                       (day, source, datetime.now().isoformat(timespec="seconds"), rows))
+        return len(balances)
+
+    def trend(self, account, since=None, until=None):
+        """One account's history: a row per as-of date and local currency, a column per bucket.
+
+        Amounts are local currency, summed over companies, document
+        currencies and exports; buckets follow TOTAL in the order they were
+        recorded.
+        """
+        query = ("SELECT as_of, local_currency, bucket, SUM(amount_local) AS amount "
+                 "FROM balances WHERE account = ?")
+        params = [account_key(account)]
+        if since is not None:
+            query += " AND as_of >= ?"
+            params.append(since.isoformat())
+        if until is not None:
+            query += " AND as_of <= ?"
+            params.append(until.isoformat())
+        query += " GROUP BY as_of, local_currency, bucket ORDER BY as_of, MIN(rowid)"
+        with self._connect() as db:
+            rows = pd.read_sql_query(query, db, params=params)
+        if rows.empty:
+            return rows
+        order = list(dict.fromkeys([TOTAL, *rows["bucket"]]))
+        trend = rows.pivot_table(index=["as_of", "local_currency"], columns="bucket",
+                                 values="amount", aggfunc="sum", sort=False)
+        return trend.reindex(columns=[name for name in order if name in trend.columns])
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+import zipfile
+
+import pandas as pd
+
+from layout import ACCOUNT_COLUMNS, LAYOUT_VERSION
+
+
+def manifest_path(output_file):
+    """The manifest that sits next to a workbook: "Final Report.manifest.json"."""
+    return os.path.splitext(os.fspath(output_file))[0] + ".manifest.json"
+
+
+def account_hash(account_df, ageing="static", as_of=None):
+    """Digest of everything an account sheet is rendered from.
+
+    Covers the sheet's columns in row order (Document_Date through its
+    serial), the layout version and the ageing mode. Static ageing also
+    covers the as-of date; the live modes write Doc_Ageing as formulas, so
+    their sheets only change with the documents.
+    """
+    names = ["Doc_Serial" if name == "Document_Date" else name for name in ACCOUNT_COLUMNS]
+    if ageing != "static":
+        names.remove("Doc_Ageing")
+    frame = account_df[names]
+    digest = hashlib.sha256(f"v{LAYOUT_VERSION}:{ageing}:".encode())
+    if ageing == "static":
+        digest.update(str(as_of).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    # Hashing goes by str() for object columns, but 898970 and "898970" are
+    # written differently (number vs text cell)
+    for name in frame.columns[frame.dtypes == object]:
+        digest.update("".join(type(v).__name__[0] for v in frame[name]).encode())
+    return digest.hexdigest()
+
+
+def _stamp(output_file):
+    stat = os.stat(output_file)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def load_manifest(output_file):
+    """{account sheet title: (hash, part)} of the workbook as last written incrementally.
+
+    Empty when there is no manifest, or when the workbook has been replaced
+    or touched since (its size and mtime no longer match), so nothing stale
+    is spliced in.
+    """
+    try:
+        with open(manifest_path(output_file)) as f:
+            manifest = json.load(f)
+        if manifest["layout"] != LAYOUT_VERSION or manifest["package"] != _stamp(output_file):
+            return {}
+        return {title: (entry["hash"], entry["part"]) for title, entry in manifest["sheets"].items()}
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def cached_sheets(output_file, manifest, hashes):
+    """Worksheet XML from the previous workbook for every sheet whose hash is unchanged.
+
+    `hashes` maps sheet titles to their new hashes; returns {title: xml}.
+    """
+    reuse = {title: manifest[title][1] for title, digest in hashes.items()
+             if title in manifest and manifest[title][0] == digest}
+    if not reuse:
+        return {}
+    with zipfile.ZipFile(output_file) as package:
+        return {title: package.read(part) for title, part in reuse.items()}
+
+
+def write_manifest(output_file, hashes, parts):
+    """Record the hash and package part of every account sheet just written."""
+    manifest = {
+        "layout": LAYOUT_VERSION,
+        "package": _stamp(output_file),
+        "sheets": {title: {"hash": hashes[title], "part": parts[title]} for title in hashes},
+    }
+    with open(manifest_path(output_file), "w") as f:
+        json.dump(manifest, f, indent=1)
@@ -0,0 +1,110 @@
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# The run being recorded, if any; stage() is a no-op without one so library
+# code can mark its stages unconditionally.
+_active = None
+
+
+class RunReport:
+    """Wall time, CPU time, memory and counts per pipeline stage.
+
+    Every stage records the process's peak RSS so far (cheap, Unix only).
+    With trace_memory, tracemalloc also gives each stage its own peak of
+    Python allocations, at the price of a several times slower run.
+    Stages nest: a stage opened inside "render" is recorded as
+    "render.widths", and its time is part of "render" too. A stage entered
+    several times (once per account, say) accumulates.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.info = {}
+        self._stack = []
+
+    @contextmanager
+    def activate(self):
+        global _active
+        previous, _active = _active, self
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        self.info["started"] = datetime.now().isoformat(timespec="seconds")
+        try:
+            with self.stage("total"):
+                yield self
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            _active = previous
+
+    @contextmanager
+    def stage(self, name, **counts):
+        if self._stack and self._stack[-1]["name"] != "total":
+            name = f"{self._stack[-1]['name']}.{name}"
+        frame = {"name": name, "counts": dict(counts), "peak": 0}
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            # Keep the enclosing stage's peak before resetting it for this one
+            if self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self._stack.append(frame)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield frame["counts"]
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self._stack.pop()
+            peak = max(frame["peak"], tracemalloc.get_traced_memory()[1]) if tracing else None
+            if tracing and self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+            self._record(name, wall, cpu, peak, frame["counts"])
+
+    def _record(self, name, wall, cpu, peak, counts):
+        entry = self.stages.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0})
+        entry["calls"] += 1
+        entry["wall_s"] += wall
+        entry["cpu_s"] += cpu
+        if resource is not None:
+            # ru_maxrss is KiB on Linux
+            entry["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        if peak is not None:
+            entry["peak_traced_mb"] = max(entry.get("peak_traced_mb", 0.0), peak / 2**20)
+        for key, value in counts.items():
+            entry[key] = entry.get(key, 0) + value
+
+    def seconds(self, name):
+        return self.stages.get(name, {}).get("wall_s", 0.0)
+
+    def write(self, path, **info):
+        report = {**self.info, **info, "stages": self.stages}
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+
+def stage(name, **counts):
+    """Time `name` in the active run report (does nothing when none is active)."""
+    if _active is None:
+        return _noop(counts)
+    return _active.stage(name, **counts)
+
+
+@contextmanager
+def _noop(counts):
+    yield counts
+
+
+def report_path(output_file):
+    """The run report that sits next to a workbook: "Final Report.run.json"."""
+    return os.path.splitext(os.fspath(output_file))[0] + ".run.json"
@@ -0,0 +1,317 @@
+import numbers
+import re
+
+import numpy as np
+import pandas as pd
+
+import instrument
+import money
+from ageing import bucket_criteria, excel_serials
+
+# What goes on the report's sheets, independent of the xlsx library writing it.
+# Column numbers are 1-based, as in openpyxl.
+
+SUMMARY_HEADERS = [
+    "Company", "Account", "Document_currency",
+    "Amount_in_doc_curr", "Local_Currency", "Amount_in_local_currency"
+]
+# Frame column behind each summary header
+SUMMARY_COLUMNS = [
+    "Comapany", "Account", "Document_currency",
+    "Amount_in_doc_curr", "Local_Currency", "Amount_in_local_currency"
+]
+# Center + bottom align only for Company, Document_currency, Local_Currency
+SUMMARY_CENTERED = {2, 4, 6}
+# Ageing bucket columns ("0-30", ..., "180+") follow these, headed by their labels
+
+ACCOUNT_HEADERS = [
+    "Company", "Account", "Document_Date", "Document_Type", "Text",
+    "Document_currency", "Amount_in_doc_curr",
+    "Local_Currency", "Amount_in_local_currency", "Doc_Ageing"
+]
+ACCOUNT_COLUMNS = [
+    "Comapany", "Account", "Document_Date", "Document_Type", "Text",
+    "Document_currency", "Amount_in_doc_curr",
+    "Local_Currency", "Amount_in_local_currency", "Doc_Ageing"
+]
+ACCOUNT_CENTERED = {4, 6, 8, 10}
+# Document dates are written as Excel serial numbers shown with this format
+DATE_FORMAT = "dd/mm/yyyy"
+# Columns that get a total under the data rows
+ACCOUNT_TOTALS = {7: "Amount_in_doc_curr", 9: "Amount_in_local_currency"}
+# Columns up to this many values are measured in plain Python, which beats
+# setting up the vectorized pass (text_lengths) on small account slices
+LOOP_ROWS = 1_000
+# Bump whenever account sheets change how they look (columns, styles, widths);
+# sheets kept from an earlier incremental run are then rendered again.
+LAYOUT_VERSION = 1
+
+# How Doc_Ageing is written: "static" numbers worked out at generation time,
+# or formulas against TODAY() or the as-of date cell on the Summary sheet, so
+# the workbook keeps ageing without being regenerated.
+AGEING_MODES = ("static", "today", "as-of")
+DATE_COL = ACCOUNT_COLUMNS.index("Document_Date") + 1
+AGEING_COL = ACCOUNT_COLUMNS.index("Doc_Ageing") + 1
+# The editable as-of date on the Summary sheet ("as-of" mode), with its label
+# to the left
+AS_OF_ROW, AS_OF_COL = 3, 3
+AS_OF_LABEL = "As at"
+AS_OF_REF = f"Summary!${chr(ord('A') + AS_OF_COL - 1)}${AS_OF_ROW}"
+
+
+# The Movements sheet (--compare): net changes per account from row 4, then
+# the new, cleared and changed items below, both from column B like the Summary
+MOVEMENT_NET_COLUMNS = [
+    "Comapany", "Account", "Local_Currency", "Previous_total", "Current_total", "Net_change",
+    "New", "Cleared", "Changed",
+]
+MOVEMENT_ITEM_COLUMNS = [
+    "Status", "Comapany", "Account", "Document_Type", "Document_Date", "Text",
+    "Document_currency", "Previous_Amount_in_doc_curr", "Current_Amount_in_doc_curr",
+    "Change_Amount_in_doc_curr", "Local_Currency", "Previous_Amount_in_local_currency",
+    "Current_Amount_in_local_currency", "Change_Amount_in_local_currency",
+]
+# Centered columns of each table (names, as they move with the layout)
+MOVEMENT_CENTERED = {"Comapany", "Local_Currency", "Status", "Document_Type", "Document_currency"}
+
+
+def movement_tables(net, items):
+    """(first row, headers, names, columns) of both tables on the Movements sheet.
+
+    Columns hold plain values; Document_Date is given as Excel serials and
+    amounts are converted back from minor units, as on the account sheets.
+    """
+    net = money.major_amounts(net, {name: "Local_Currency"
+                                    for name in ("Previous_total", "Current_total", "Net_change")})
+    items = money.major_amounts(items, {f"{side}_{name}": currency
+                                        for name, currency in money.AMOUNT_CURRENCIES.items()
+                                        for side in ("Previous", "Current", "Change")})
+    tables = []
+    row = 4
+    for frame, names in ((net, MOVEMENT_NET_COLUMNS), (items, MOVEMENT_ITEM_COLUMNS)):
+        headers = ["Company" if name == "Comapany" else name for name in names]
+        columns = [cell_values(excel_serials(frame[name]) if name == "Document_Date" else frame[name])
+                   for name in names]
+        tables.append((row, headers, names, columns))
+        row += len(frame) + 3
+    return tables
+
+
+def summary_layout(sums):
+    """(headers, frame columns) of the Summary: the fixed ones, then any ageing buckets."""
+    buckets = [name for name in sums.columns if name not in SUMMARY_COLUMNS]
+    return SUMMARY_HEADERS + buckets, SUMMARY_COLUMNS + buckets
+
+
+def summary_amounts(sums):
+    """Summary lines with their amounts (summed as minor units) as amounts again, for writing."""
+    _, names = summary_layout(sums)
+    currencies = {**money.AMOUNT_CURRENCIES,
+                  **{name: "Local_Currency" for name in names[len(SUMMARY_COLUMNS):]}}
+    return money.major_amounts(sums, currencies)
+
+
+def summary_title(today_str):
+    return f"Document Ageing Report as at {today_str}"
+
+
+def _as_of_expression(ageing):
+    return "TODAY()" if ageing == "today" else AS_OF_REF
+
+
+def summary_title_formula(ageing):
+    """The title as a formula that follows the ageing date ("today"/"as-of" modes)."""
+    return f'="{summary_title("")}"&TEXT({_as_of_expression(ageing)},"dd.mm.yyyy")'
+
+
+def live_ageing_columns(account_df, columns, ageing):
+    """account_columns with Doc_Ageing as formulas, for the live modes.
+
+    Doc_Ageing on sheet row r becomes "=TODAY()-C{r}" or "=Summary!$C$3-C{r}";
+    rows without a date stay empty, as in static mode.
+    """
+    present = account_df["Document_Date"].notna().to_numpy()
+    date_letter = chr(ord("A") + DATE_COL - 1)
+    expression = _as_of_expression(ageing)
+    formulas = [f"={expression}-{date_letter}{row}" if has_date else None
+                for row, has_date in enumerate(present, start=2)]
+
+    columns = list(columns)
+    columns[AGEING_COL - 1] = formulas
+    return columns
+
+
+def _criterion(value):
+    # Numbers as they are, text quoted with Excel's wildcards taken literally
+    if isinstance(value, numbers.Number):
+        return str(value)
+    text = re.sub(r"([~*?])", r"~\1", str(value)).replace('"', '""')
+    return f'"{text}"'
+
+
+def _sheet_range(title, name):
+    # Whole column of an account sheet, e.g. '63010001'!$J:$J
+    letter = chr(ord("A") + ACCOUNT_COLUMNS.index(name))
+    return "'{}'!${}:${}".format(str(title).replace("'", "''"), letter, letter)
+
+
+def live_bucket_columns(sums, columns):
+    """summary_values' columns with the ageing buckets as formulas, for the live modes.
+
+    Each bucket cell is a SUMIFS over the line's account sheet: the local
+    amounts of its company and currencies whose Doc_Ageing (a formula
+    against TODAY() or the as-of date there) falls in the bucket, so the
+    buckets age along with the sheets and the title.
+    """
+    _, names = summary_layout(sums)
+    keys = ["Comapany", "Document_currency", "Local_Currency"]
+    lines = [
+        (account, ",".join(f"{_sheet_range(account, name)},{_criterion(value)}"
+                           for name, value in zip(keys, values)))
+        for account, *values in zip(sums["Account"], *(sums[name] for name in keys))
+    ]
+    columns = list(columns)
+    for i, label in enumerate(names[len(SUMMARY_COLUMNS):], start=len(SUMMARY_COLUMNS)):
+        criteria = bucket_criteria(label)
+        columns[i] = [
+            f"=SUMIFS({_sheet_range(account, 'Amount_in_local_currency')},{match}"
+            + "".join(f',{_sheet_range(account, "Doc_Ageing")},"{criterion}"' for criterion in criteria)
+            + ")"
+            for account, match in lines
+        ]
+    return columns
+
+
+def account_totals(account_df):
+    # Exact per currency, should an account mix currencies
+    return {col: money.total(account_df[name], account_df[money.AMOUNT_CURRENCIES[name]])
+            for col, name in ACCOUNT_TOTALS.items()}
+
+
+def account_columns(account_df):
+    """Values of an account sheet, one sequence per column in ACCOUNT_HEADERS order.
+
+    Document_Date is given as its Excel serial (Doc_Serial), to be written
+    as a number with DATE_FORMAT, and amounts are converted back from minor
+    units.
+    """
+    columns = []
+    for name in ACCOUNT_COLUMNS:
+        values = account_df["Doc_Serial" if name == "Document_Date" else name]
+        if name in money.AMOUNT_CURRENCIES:
+            values = money.to_major(values, account_df[money.AMOUNT_CURRENCIES[name]])
+        columns.append(cell_values(values))
+    return columns
+
+
+def cell_values(values):
+    if isinstance(values.dtype, pd.Int32Dtype):
+        # Missing dates/ages become empty cells (xlsx libraries reject pd.NA)
+        values = values.astype(object)
+        values = values.where(values.notna(), None)
+    return values
+
+
+def text_lengths(values):
+    """len(str(v)) of every value once written, 0 for empty (falsy) ones, as an int array."""
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Measure each category once and look the lengths up by code; code
+        # -1 (missing, written as NaN) takes the last entry
+        categories = pd.Series(values.cat.categories)
+        lengths = categories.astype(str).str.len().where(categories.astype(bool), 0).to_numpy()
+        lengths = np.append(lengths, len("nan"))
+        return lengths[values.cat.codes.to_numpy()]
+    present = values.astype(bool).to_numpy()
+    lengths = np.zeros(len(values), dtype="int64")
+    # Missing values are truthy and reach the sheet as NaN, i.e. "nan"
+    lengths[present] = values[present].astype(str).str.len().fillna(len("nan")).to_numpy()
+    return lengths
+
+
+def text_width(values):
+    """Length of the longest non-empty value once written, i.e. max len(str(v)) over truthy v."""
+    if len(values) <= LOOP_ROWS:
+        return max((len(str(v)) for v in values if v), default=0)
+    return int(text_lengths(values).max())
+
+
+def column_widths(texts, columns=(), offset=0, lengths=None):
+    """Column widths (longest text + 2), taken from the data rather than the cells.
+
+    `texts` maps a 1-based column number to the extra texts in that column
+    (headers, titles, totals); `columns` are the data values starting at
+    column offset + 1, or `lengths` their longest texts per column number
+    when measured already. Works before any cell exists, so the streaming
+    writer can use it too.
+    """
+    lengths = dict(lengths or {})
+    for col, extra in texts.items():
+        lengths[col] = max(lengths.get(col, 0), max((len(str(v)) for v in extra if v), default=0))
+    for col, values in enumerate(columns, start=offset + 1):
+        lengths[col] = max(lengths.get(col, 0), text_width(values))
+    return {col: length + 2 for col, length in sorted(lengths.items())}
+
+
+def summary_widths(sums, title):
+    headers, names = summary_layout(sums)
+    texts = {col: [header] for col, header in enumerate(headers, start=2)}
+    texts[1] = []
+    texts[2].append(title)
+    with instrument.stage("widths"):
+        return column_widths(texts, [sums[name] for name in names], offset=1)
+
+
+def movement_widths(tables, title):
+    """Widest text of each column over both Movements tables (dates as DATE_FORMAT)."""
+    widths = {2: len(title) + 2}
+    for _, headers, names, columns in tables:
+        texts = {col: [header] for col, header in enumerate(headers, start=2)}
+        columns = list(columns)
+        if "Document_Date" in names:
+            columns[names.index("Document_Date")] = []
+            texts[names.index("Document_Date") + 2].append(DATE_FORMAT)
+        with instrument.stage("widths"):
+            for col, width in column_widths(texts, columns, offset=1).items():
+                widths[col] = max(widths.get(col, 0), width)
+    return widths
+
+
+def account_text_lengths(df, column="Account"):
+    """Longest text of each account sheet's data columns, for every account at once.
+
+    One {column number: length} per account, in iter_accounts order. The
+    lengths are measured once over the whole frame and the longest per
+    account taken with a single groupby on the account codes, instead of a
+    pass over every column of every account's rows; account_widths takes
+    them as they are.
+    """
+    codes, accounts = pd.factorize(df[column], sort=False, use_na_sentinel=False)
+    lengths = {}
+    with instrument.stage("widths"):
+        for col, values in enumerate(account_columns(df), start=1):
+            if col == DATE_COL:
+                # Dates show as dd/mm/yyyy, whatever their serial's length
+                lengths[col] = np.where(pd.notna(values), len(DATE_FORMAT), 0)
+            else:
+                lengths[col] = text_lengths(values)
+        longest = pd.DataFrame(lengths).groupby(codes).max()
+        longest = longest.reindex(range(len(accounts)), fill_value=0)
+        # A missing account's sheet is empty (see partition.iter_accounts)
+        longest[pd.isna(accounts)] = 0
+        return longest.to_dict("records")
+
+
+def account_widths(columns, totals, lengths=None):
+    """Widths of an account sheet; `lengths` from account_text_lengths spare measuring `columns`."""
+    texts = {col: [header, totals.get(col)] for col, header in enumerate(ACCOUNT_HEADERS, start=1)}
+    if lengths is not None:
+        return column_widths(texts, lengths=lengths)
+    # Dates show as dd/mm/yyyy, whatever their serial's length
+    columns = list(columns)
+    dates = pd.Series(columns[DATE_COL - 1])
+    columns[DATE_COL - 1] = []
+    if dates.notna().any():
+        texts[DATE_COL].append(DATE_FORMAT)
+    with instrument.stage("widths"):
+        return column_widths(texts, columns)
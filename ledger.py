@@ -0,0 +1,181 @@
+import importlib.util
+import os
+import sqlite3
+
+import pandas as pd
+
+from ageing import EXCEL_EPOCH
+
+# Embedded databases for --out-of-core; "auto" is DuckDB when installed
+LEDGER_ENGINES = ("auto", "sqlite", "duckdb")
+
+# What is kept of every row: the account sheets' columns, with
+# Document_Date as its Excel serial (Doc_Serial)
+ROW_COLUMNS = [
+    "Comapany", "Account", "Document_Type", "Text", "Document_currency", "Amount_in_doc_curr",
+    "Local_Currency", "Amount_in_local_currency", "Doc_Serial", "Doc_Ageing",
+]
+SUMMARY_KEYS = ["Comapany", "Account", "Document_currency", "Local_Currency"]
+# DuckDB column types, fixed up front: inferred from the first chunk, a
+# column empty there would get a type later chunks don't fit. Accounts are
+# float64 once normalized (see normalize_export).
+DUCKDB_TYPES = {
+    "seq": "BIGINT", "Comapany": "VARCHAR", "Account": "DOUBLE", "Document_Type": "VARCHAR",
+    "Text": "VARCHAR", "Document_currency": "VARCHAR", "Amount_in_doc_curr": "BIGINT",
+    "Local_Currency": "VARCHAR", "Amount_in_local_currency": "BIGINT",
+    "Doc_Serial": "INTEGER", "Doc_Ageing": "INTEGER",
+}
+# Rows fetched from a cursor at a time
+FETCH_ROWS = 10_000
+
+
+def ledger_engine(engine="auto"):
+    if engine == "auto":
+        return "duckdb" if importlib.util.find_spec("duckdb") is not None else "sqlite"
+    return engine
+
+
+class LedgerStore:
+    """An export's rows in an on-disk database, for exports larger than memory.
+
+    Chunks are appended as they are read; the summary is then one GROUP BY
+    query and each account sheet's rows come from an indexed query read
+    through a cursor, so only one account's rows are in memory at a time.
+    SQLite columns have no declared type and keep values as given (Text
+    that is sometimes a number stays a number); DuckDB's are typed up front
+    (DUCKDB_TYPES), with Text as text.
+    """
+
+    def __init__(self, path, engine="auto"):
+        self.path = os.fspath(path)
+        self.engine = ledger_engine(engine)
+        if self.engine == "duckdb":
+            try:
+                import duckdb
+            except ImportError:
+                raise ImportError("the duckdb ledger needs the duckdb package "
+                                  "(pip install duckdb)") from None
+            self.db = duckdb.connect(self.path)
+        else:
+            self.db = sqlite3.connect(self.path)
+            # A scratch database: no journal, no waiting for the disk
+            self.db.execute("PRAGMA journal_mode = OFF")
+            self.db.execute("PRAGMA synchronous = OFF")
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self.db.close()
+
+    def append(self, df):
+        """Add a normalized, aged chunk (see add_ageing), in export order."""
+        chunk = pd.DataFrame({"seq": range(self.rows, self.rows + len(df))})
+        for name in ROW_COLUMNS:
+            values = df[name]
+            if isinstance(values.dtype, pd.CategoricalDtype) or name == "Text":
+                values = values.astype(object)
+            chunk[name] = values.to_numpy()
+        if self.engine == "duckdb":
+            chunk["Text"] = chunk["Text"].map(lambda v: None if pd.isna(v) else str(v))
+            # NaN is a value to DuckDB, not NULL as it is to SQLite
+            chunk = chunk.astype({"Doc_Serial": "Int32", "Doc_Ageing": "Int32",
+                                  "Amount_in_doc_curr": "Int64", "Amount_in_local_currency": "Int64"})
+            if pd.api.types.is_float_dtype(chunk["Account"]):
+                chunk["Account"] = chunk["Account"].astype("Float64")
+            self.db.register("chunk", chunk)
+            if not self.rows:
+                self.db.execute(f"CREATE TABLE rows ({', '.join(f'{name} {kind}' for name, kind in DUCKDB_TYPES.items())})")
+            self.db.execute(f"INSERT INTO rows SELECT "
+                            f"{', '.join(f'CAST({name} AS {kind})' for name, kind in DUCKDB_TYPES.items())} "
+                            f"FROM chunk")
+            self.db.unregister("chunk")
+        else:
+            if not self.rows:
+                self.db.execute(f"CREATE TABLE rows (seq INTEGER PRIMARY KEY, {', '.join(ROW_COLUMNS)})")
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            with self.db:
+                self.db.executemany(f"INSERT INTO rows VALUES ({', '.join('?' * (len(ROW_COLUMNS) + 1))})",
+                                    chunk.itertuples(index=False, name=None))
+        self.rows += len(df)
+
+    def index(self):
+        """Index the loaded rows; built once after loading, which beats updating per chunk."""
+        self.db.execute("CREATE INDEX rows_account ON rows (Account, seq)")
+        self.db.execute(f"CREATE INDEX rows_summary ON rows ({', '.join(SUMMARY_KEYS)})")
+
+    def summary_rows(self, buckets):
+        """The rows' amounts per SUMMARY_KEYS line and ageing bucket, as a small frame.
+
+        Every group gets the smallest Doc_Ageing in it, which falls in the
+        group's bucket, so the frame can go through summary_matrix like
+        the rows themselves. Lines with a missing key are left out, as
+        groupby does.
+        """
+        keys = ", ".join(SUMMARY_KEYS)
+        groups = keys
+        if buckets:
+            # No buckets, no bucket term: a bare number in GROUP BY would be
+            # read as a column position
+            cases = " ".join(f"WHEN Doc_Ageing <= {int(edge)} THEN {i}" for i, edge in enumerate(buckets))
+            groups += f", CASE WHEN Doc_Ageing IS NULL THEN -1 {cases} ELSE {len(buckets)} END"
+        query = (f"SELECT {keys}, SUM(Amount_in_doc_curr), SUM(Amount_in_local_currency), "
+                 f"MIN(Doc_Ageing) FROM rows "
+                 f"WHERE {' AND '.join(f'{key} IS NOT NULL' for key in SUMMARY_KEYS)} "
+                 f"GROUP BY {groups}")
+        lines = pd.DataFrame(self.db.execute(query).fetchall(), columns=SUMMARY_KEYS + [
+            "Amount_in_doc_curr", "Amount_in_local_currency", "Doc_Ageing"])
+        lines = lines.astype({key: "category" for key in SUMMARY_KEYS})
+        # Minor units: integer sums are exact in both engines
+        lines[["Amount_in_doc_curr", "Amount_in_local_currency"]] = (
+            lines[["Amount_in_doc_curr", "Amount_in_local_currency"]].astype("Int64").fillna(0))
+        lines["Doc_Ageing"] = lines["Doc_Ageing"].astype("Int32")
+        return lines
+
+    def accounts(self):
+        """Every account (None for rows without one), in order of first appearance."""
+        return [row[0] for row in
+                self.db.execute("SELECT Account FROM rows GROUP BY Account ORDER BY MIN(seq)").fetchall()]
+
+    def account_rows(self, account, sort_by=None, ascending=True):
+        """One account's rows as a frame shaped like the loaded export's.
+
+        Rows keep their export order unless sort_by is given; missing values
+        sort last, as in partition.iter_accounts.
+        """
+        order = "seq"
+        if sort_by is not None:
+            column = "Doc_Serial" if sort_by in ("Document_Date", "Doc_Serial") else sort_by
+            if column not in ROW_COLUMNS:
+                raise ValueError(f"cannot sort account rows by {sort_by!r}")
+            order = f"{column} IS NULL, {column} {'ASC' if ascending else 'DESC'}, seq"
+        cursor = self.db.execute(f"SELECT {', '.join(ROW_COLUMNS)} FROM rows "
+                                 f"WHERE Account = ? ORDER BY {order}", [account])
+        records = []
+        while batch := cursor.fetchmany(FETCH_ROWS):
+            records.extend(batch)
+        return account_frame(records)
+
+    def iter_accounts(self, sort_by=None, ascending=True):
+        """Yield (account, rows) like partition.iter_accounts, one query per account."""
+        for account in self.accounts():
+            if account is None:
+                # The export's grand-total line: an empty sheet, as before
+                yield float("nan"), account_frame([])
+            else:
+                yield account, self.account_rows(account, sort_by, ascending)
+
+
+def account_frame(records):
+    df = pd.DataFrame.from_records(records, columns=ROW_COLUMNS)
+    for name in ("Amount_in_doc_curr", "Amount_in_local_currency"):
+        df[name] = df[name].astype("Int64")
+    for name in ("Doc_Serial", "Doc_Ageing"):
+        df[name] = df[name].astype("Int32")
+    df["Document_Date"] = EXCEL_EPOCH + pd.to_timedelta(df["Doc_Serial"].astype("float64"), unit="D")
+    return df
@@ -0,0 +1,108 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Minor-unit decimal places of the currencies that don't have two (ISO 4217);
+# anything else, including a missing currency, has DEFAULT_DECIMALS.
+DECIMALS = {
+    "BIF": 0, "CLP": 0, "DJF": 0, "GNF": 0, "ISK": 0, "JPY": 0, "KMF": 0, "KRW": 0,
+    "PYG": 0, "RWF": 0, "UGX": 0, "UYI": 0, "VND": 0, "VUV": 0, "XAF": 0, "XOF": 0,
+    "XPF": 0,
+    "BHD": 3, "IQD": 3, "JOD": 3, "KWD": 3, "LYD": 3, "OMR": 3, "TND": 3,
+    "CLF": 4, "UYW": 4,
+}
+DEFAULT_DECIMALS = 2
+
+# Currency column each amount column is in
+AMOUNT_CURRENCIES = {
+    "Amount_in_doc_curr": "Document_currency",
+    "Amount_in_local_currency": "Local_Currency",
+}
+
+
+def decimals(currencies):
+    """Decimal places of every value of a currency column, as an int array."""
+    currencies = pd.Series(currencies)
+    if not isinstance(currencies.dtype, pd.CategoricalDtype):
+        currencies = currencies.astype("category")
+    # Look each currency up once; code -1 (missing) takes the last entry
+    lookup = np.array([DECIMALS.get(str(code).strip().upper(), DEFAULT_DECIMALS)
+                       for code in currencies.cat.categories] + [DEFAULT_DECIMALS])
+    return lookup[currencies.cat.codes.to_numpy()]
+
+
+def to_minor(amounts, currencies):
+    """Amounts as whole minor units (cents, yen, fils), exactly, as int64.
+
+    Missing amounts stay missing, as the nullable Int64 type. Amounts with
+    more decimals than their currency has are rounded half away from zero
+    (JPY 1234.5 to 1235), with a warning counting them.
+    """
+    values = amounts.to_numpy(dtype="float64", na_value=np.nan)
+    places = decimals(currencies)
+    scale = 10.0 ** places
+    scaled = values * scale
+    minor = np.trunc(scaled + np.copysign(0.5, scaled))
+    # Float noise from sums in Excel (-238931747.1600006) is not extra decimals
+    rounded = ~np.isclose(minor, scaled, rtol=1e-12, atol=1e-6) & ~np.isnan(values)
+    if rounded.any():
+        first = np.flatnonzero(rounded)[0]
+        currency = pd.Series(currencies).iloc[first]
+        warnings.warn(
+            f"{int(rounded.sum())} {amounts.name or 'amount'} value(s) have more decimals than "
+            f"their currency, e.g. {float(values[first])!r} {currency}; rounded to "
+            f"{places[first]} decimal place(s)",
+            stacklevel=2,
+        )
+    if np.isnan(minor).any():
+        return pd.Series(minor, index=amounts.index).astype("Int64")
+    return pd.Series(minor.astype("int64"), index=amounts.index)
+
+
+def to_major(minor, currencies):
+    """Minor units back to amounts (float64, NaN where missing), for writing.
+
+    Float columns are taken to be amounts already and come back as they are.
+    """
+    minor = pd.Series(minor)
+    if pd.api.types.is_float_dtype(minor.dtype):
+        return minor.astype("float64")
+    values = minor.to_numpy(dtype="float64", na_value=np.nan)
+    # Division is correctly rounded: 1038019 / 100 is the float closest to 10380.19
+    return pd.Series(values / 10.0 ** decimals(currencies), index=minor.index)
+
+
+def total(minor, currencies):
+    """Sum of amounts that may be in several currencies.
+
+    Minor units with the same decimal places are summed exactly as
+    integers; only those few totals are converted and added up.
+    """
+    minor = pd.Series(minor)
+    if pd.api.types.is_float_dtype(minor.dtype):
+        return minor.sum()
+    values = minor.to_numpy(dtype="int64", na_value=0)
+    places = decimals(currencies)
+    if len(places) and (places == places[0]).all():
+        return values.sum() / 10.0 ** places[0]
+    return float(sum(values[places == p].sum() / 10.0 ** p for p in np.unique(places)))
+
+
+def minor_amounts(df):
+    """Convert a frame's amount columns to minor units of their currencies, in place."""
+    for name, currency in AMOUNT_CURRENCIES.items():
+        if name in df.columns:
+            df[name] = to_minor(df[name], df[currency])
+    return df
+
+
+def major_amounts(df, columns):
+    """A copy of df with amount columns in minor units as amounts again.
+
+    `columns` maps each amount column to the column holding its currency.
+    """
+    df = df.copy()
+    for name, currency in columns.items():
+        df[name] = to_major(df[name], df[currency])
+    return df
@@ -0,0 +1,154 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# What identifies a document in the export, which has no document number:
+# two exports' rows with equal keys are the same document. Amounts are left
+# out so a document whose amount changed is still matched.
+KEY_COLUMNS = ["Comapany", "Account", "Document_Type", "Document_Date", "Text",
+               "Document_currency", "Local_Currency"]
+AMOUNT_COLUMNS = ["Amount_in_doc_curr", "Amount_in_local_currency"]
+# Accounts the net changes are given for
+NET_KEYS = ["Comapany", "Account", "Local_Currency"]
+
+NEW, CLEARED, CHANGED = "New", "Cleared", "Changed"
+STATUSES = [NEW, CLEARED, CHANGED]
+
+
+def document_keys(df, columns=KEY_COLUMNS):
+    """64-bit hash of every row's document key, in row order.
+
+    Values are hashed as key_values gives them, so two exports' rows get
+    the same key whatever types their readers chose.
+    """
+    keys = pd.DataFrame({name: key_values(df[name]) for name in columns})
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+def key_values(values):
+    """A key column in one type: dates as datetime64[ns], amounts as Int64, the rest as text.
+
+    898970, 898970.0 and "898970" are the same text, as Account may be
+    int64 or float64 and Text a number or a string depending on the
+    export. Missing values stay missing.
+    """
+    if values.name == "Document_Date":
+        return pd.to_datetime(values, errors="coerce").astype("datetime64[ns]")
+    if values.name in AMOUNT_COLUMNS:
+        return values.astype("Int64")
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype("category")
+    # Text of each category once; categories with the same text merge
+    merged, texts = pd.factorize(pd.Index(values.cat.categories, dtype=object).map(_key_text))
+    codes = values.cat.codes.to_numpy()
+    return pd.Categorical.from_codes(np.where(codes >= 0, merged[codes], -1), texts)
+
+
+def _key_text(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def occurrences(keys):
+    """0, 1, ... for the rows sharing each key, in row order.
+
+    Pairs up documents that share a key, e.g. two identical postings on
+    the same day.
+    """
+    return pd.Series(keys).groupby(keys, sort=False).cumcount().to_numpy()
+
+
+def _sides(df, prefix):
+    sides = pd.DataFrame({
+        "key": document_keys(df),
+        "exact": document_keys(df, KEY_COLUMNS + AMOUNT_COLUMNS),
+        prefix + "row": np.arange(len(df)),
+    })
+    for name in AMOUNT_COLUMNS:
+        # Nullable, so the outer join leaves the minor units integers
+        sides[prefix + name] = pd.array(df[name], dtype="Int64")
+    return sides
+
+
+def _join(previous, current, key, how):
+    # Hash join on the key and its occurrence within each side
+    previous = previous.assign(occurrence=occurrences(previous[key].to_numpy()))
+    current = current.assign(occurrence=occurrences(current[key].to_numpy()))
+    return previous.merge(current, on=[key, "occurrence"], how=how, sort=False)
+
+
+def compare_exports(previous, current):
+    """Documents that are new, cleared or changed amount between two normalized exports.
+
+    Rows are matched with hash joins on document_keys: first with the
+    amounts included, which takes out every unchanged document, then on
+    the key alone among the rest, so a cleared duplicate never shifts its
+    twins' pairing. Amounts are whole minor units (see money.py), so any
+    difference is a change. Returns (items, net): items has a Status column, the
+    KEY_COLUMNS and each amount as Previous_/Current_/Change_ columns; net
+    has per NET_KEYS account the previous and current local-currency
+    totals, the net change and the number of items of each status. Rows
+    without an account (the export's grand-total line) are left out, as
+    on the account sheets.
+    """
+    previous = previous[previous["Account"].notna()]
+    current = current[current["Account"].notna()]
+
+    before, after = _sides(previous, "Previous_"), _sides(current, "Current_")
+    same = _join(before[["exact", "Previous_row"]], after[["exact", "Current_row"]], "exact", "inner")
+    before = before[~np.isin(before["Previous_row"], same["Previous_row"])].drop(columns="exact")
+    after = after[~np.isin(after["Current_row"], same["Current_row"])].drop(columns="exact")
+
+    merged = _join(before, after, "key", "outer")
+    in_previous = merged["Previous_row"].notna().to_numpy()
+    in_current = merged["Current_row"].notna().to_numpy()
+    changed = np.zeros(len(merged), dtype=bool)
+    for name in AMOUNT_COLUMNS:
+        merged[f"Change_{name}"] = merged[f"Current_{name}"].fillna(0) - merged[f"Previous_{name}"].fillna(0)
+        changed |= (merged[f"Change_{name}"] != 0).to_numpy()
+    status = np.select([~in_previous, ~in_current, changed], STATUSES, default="")
+    merged["Status"] = status
+    merged = merged[status != ""]
+
+    # Key values come from the current export, or the previous one for cleared items
+    from_current = merged["Current_row"].notna()
+    keys = pd.concat([
+        current[KEY_COLUMNS].iloc[merged.loc[from_current, "Current_row"].astype(int)],
+        previous[KEY_COLUMNS].iloc[merged.loc[~from_current, "Previous_row"].astype(int)],
+    ], ignore_index=True)
+    amounts = pd.concat([merged[from_current], merged[~from_current]], ignore_index=True)
+    amount_columns = [f"{side}_{name}" for name in AMOUNT_COLUMNS
+                      for side in ("Previous", "Current", "Change")]
+    items = pd.concat([amounts[["Status"]], keys, amounts[amount_columns]], axis=1)
+    items["Status"] = pd.Categorical(items["Status"], STATUSES)
+    items = items.sort_values(["Account", "Status"], kind="stable", ignore_index=True)
+
+    return items, net_changes(previous, current, items)
+
+
+def _by_account(df, *extra):
+    # Plain values, so groupings of exports with different categories line up
+    keys = [df[name].astype(object) for name in (*NET_KEYS, *extra)]
+    return df.groupby(keys, dropna=False, sort=False)
+
+
+def net_changes(previous, current, items):
+    """Local-currency totals per NET_KEYS account in both exports, and the item counts."""
+    local = "Amount_in_local_currency"
+    totals = pd.concat([
+        _by_account(previous)[local].sum().rename("Previous_total"),
+        _by_account(current)[local].sum().rename("Current_total"),
+    ], axis=1).fillna(0).astype("int64")
+    totals["Net_change"] = totals["Current_total"] - totals["Previous_total"]
+    counts = (_by_account(items, "Status").size().unstack("Status", fill_value=0)
+              .reindex(columns=STATUSES, fill_value=0))
+    net = totals.join(counts).fillna(0)
+    net[STATUSES] = net[STATUSES].astype(int)
+    net = net[(net["Net_change"] != 0) | (net[STATUSES].sum(axis=1) > 0)]
+    return net.sort_index().reset_index()
+
+
+def movements_title(previous_file):
+    return f"Document movements since {os.path.basename(os.fspath(previous_file))}"
@@ -0,0 +1,55 @@
+import io
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import openpyxl
+
+import styles
+
+
+def render_sheet_xml(render, title, *args):
+    """Worksheet XML of one sheet, rendered on its own in a write-only workbook.
+
+    `render(wb, title, *args, registry)` must create exactly one sheet.
+    openpyxl writes strings inline and StyleRegistry fixes the style ids,
+    so the XML is valid as-is inside another workbook using the registry.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    render(wb, title, *args, styles.StyleRegistry(wb))
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    with zipfile.ZipFile(buffer) as package:
+        return package.read("xl/worksheets/sheet1.xml")
+
+
+def render_sheets(render, jobs, workers):
+    """Render (title, args, weight) jobs in a process pool, heaviest first.
+
+    Returns the XML of every sheet in the order of `jobs`. With one worker
+    (or none) the sheets are rendered in this process instead.
+    """
+    if workers <= 1:
+        return [render_sheet_xml(render, title, *args) for title, args, _ in jobs]
+    results = [None] * len(jobs)
+    order = sorted(range(len(jobs)), key=lambda i: jobs[i][2], reverse=True)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {i: pool.submit(render_sheet_xml, render, jobs[i][0], *jobs[i][1])
+                   for i in order}
+        for i, future in futures.items():
+            results[i] = future.result()
+    return results
+
+
+def save_with_sheets(wb, output_file, sheet_xml):
+    """Save wb, swapping in pre-rendered XML for the sheets at the given positions.
+
+    `sheet_xml` maps a 0-based position in wb.worksheets to worksheet XML;
+    those sheets are expected to be empty placeholders in wb.
+    """
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    parts = {f"xl/worksheets/sheet{i + 1}.xml": xml for i, xml in sheet_xml.items()}
+    with zipfile.ZipFile(buffer) as source, \
+            zipfile.ZipFile(output_file, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            target.writestr(info, parts.get(info.filename) or source.read(info.filename))
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+
+def iter_accounts(df, sort_by=None, ascending=True, column="Account"):
+    """Yield (account, rows) for every account in order of first appearance.
+
+    The frame is reordered once (stable, so rows keep their export order
+    unless sort_by is given) and each account's rows are handed out as an
+    iloc slice of that single copy instead of a boolean mask per account.
+    """
+    codes, accounts = pd.factorize(df[column], sort=False, use_na_sentinel=False)
+
+    if sort_by is None:
+        order = np.argsort(codes, kind="stable")
+    else:
+        keys = pd.DataFrame({"code": codes, "key": df[sort_by].array})
+        order = keys.sort_values(["code", "key"], ascending=[True, ascending],
+                                 kind="stable", na_position="last").index.to_numpy()
+
+    ordered = df.take(order)
+    bounds = np.searchsorted(codes[order], np.arange(len(accounts) + 1))
+
+    for account, start, stop in zip(accounts, bounds[:-1], bounds[1:]):
+        if pd.isna(account):
+            # A missing account never matched `df[column] == account`, so its
+            # sheet has always been empty (the export's grand-total line).
+            start = stop
+        yield account, ordered.iloc[start:stop]
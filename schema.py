@@ -0,0 +1,140 @@
+import re
+import warnings
+
+import pandas as pd
+
+# Canonical name of every column the report reads (as normalize_export spells
+# them, including the ERP's "Comapany"), with other headers known to mean the
+# same thing. Matching ignores case, spaces and dots, like normalize_name.
+COLUMNS = {
+    "Comapany": ("Company", "Company Code", "CoCd"),
+    "Account": ("G/L Account", "GL Account", "Account Number"),
+    "Document_Date": ("Doc. Date", "Doc Date"),
+    "Document_Type": ("Doc. Type", "Doc Type", "Type"),
+    "Text": ("Item Text", "Description"),
+    "Document_currency": ("Doc. currency", "Currency", "Curr."),
+    "Amount_in_doc_curr": ("Amount in document currency", "Amount in DC", "Amount"),
+    "Local_Currency": ("LCurr", "Local Curr."),
+    "Amount_in_local_currency": ("Amount in LC", "Amount in local curr."),
+}
+
+# Types the columns are read as, so the Excel reader neither infers them nor
+# keeps the rest of the export. Document dates stay raw (they may be text or
+# real dates) until parse_dates; Account is left to inference, as some ERPs
+# export account numbers as text.
+DTYPES = {
+    "Comapany": "category",
+    "Document_Date": object,
+    "Document_Type": "category",
+    "Text": object,
+    "Document_currency": "category",
+    "Amount_in_doc_curr": "float64",
+    "Local_Currency": "category",
+    "Amount_in_local_currency": "float64",
+}
+# How the ERP writes dates as text: 01.06.2020 is 1 June
+EXPORT_DATE_FORMAT = "%d.%m.%Y"
+
+
+class SchemaError(ValueError):
+    """An export's header lacks columns the report needs, or has them twice."""
+
+
+def normalize_name(name):
+    """Header as a column name: runs of spaces/dots become one "_", none at the ends."""
+    return re.sub(r"_+", "_", re.sub(r"[ .]", "_", str(name))).strip("_")
+
+
+def _key(name):
+    return normalize_name(name).lower()
+
+
+_CANONICAL = {_key(name): canonical
+              for canonical, aliases in COLUMNS.items()
+              for name in (canonical, *aliases)}
+
+
+def canonical_name(name):
+    """Canonical column name for a header; unknown headers are just normalized."""
+    return _CANONICAL.get(_key(name), normalize_name(name))
+
+
+def column_names(headers):
+    """Column name of every header of an export, in order.
+
+    A header spelled as a column's own name takes it; aliases only stand in
+    for columns no header names outright, so an extra "Amount" next to
+    "Amount in doc. curr." stays an unknown (normalized) header.
+    """
+    names = [canonical_name(header) for header in headers]
+    named = {name for header, name in zip(headers, names) if _key(header) == _key(name)}
+    return [normalize_name(header) if name in named and _key(header) != _key(name) else name
+            for header, name in zip(headers, names)]
+
+
+def resolve(headers, source="export"):
+    """Map each header to its column name, checking the report's columns are all there.
+
+    Raises SchemaError naming the missing columns, or those two headers
+    compete for (see column_names).
+    """
+    names = column_names(headers)
+    missing = [name for name in COLUMNS if name not in names]
+    if missing:
+        raise SchemaError(f"{source} is missing column(s) {', '.join(missing)} "
+                          f"(header: {', '.join(map(str, headers))})")
+    doubled = sorted({name for name in names if name in COLUMNS and names.count(name) > 1})
+    if doubled:
+        raise SchemaError(f"{source} has more than one column for {', '.join(doubled)} "
+                          f"(header: {', '.join(map(str, headers))})")
+    return dict(zip(headers, names))
+
+
+def parse_dates(values):
+    """Document dates as datetime64 from EXPORT_DATE_FORMAT text or real dates.
+
+    Text in another layout (an ERP's CSV may write 2020-06-01 or
+    01/06/2020) is read as ISO 8601, then as any day-first date. Dates
+    that still can't be read become NaT, aged as undated, with a warning
+    counting them.
+    """
+    values = pd.Series(values)
+    dates = pd.to_datetime(values, format=EXPORT_DATE_FORMAT, errors="coerce")
+    missed = dates.isna() & values.notna()
+    if not missed.any():
+        return dates
+    # Only the few misses go through the slower fallbacks
+    text = values[missed].map(lambda v: v.strip() if isinstance(v, str) else v)
+    text = text[text != ""]
+    parsed = pd.to_datetime(text, format="ISO8601", errors="coerce")
+    rest = parsed.isna()
+    if rest.any():
+        parsed[rest] = pd.to_datetime(text[rest].astype(str), dayfirst=True, format="mixed",
+                                      errors="coerce")
+    dates[parsed.index] = parsed
+    unread = text[parsed.isna()]
+    if len(unread):
+        warnings.warn(f"{len(unread)} document date(s) could not be read (e.g. {unread.iloc[0]!r}); "
+                      f"those rows are treated as undated", stacklevel=2)
+    return dates
+
+
+def read_options(headers):
+    """read_excel arguments that decode only the report's columns, with DTYPES.
+
+    `headers` is the mapping returned by resolve/probe.
+    """
+    wanted = {header: name for header, name in headers.items() if name in COLUMNS}
+    return {
+        "usecols": list(wanted),
+        "dtype": {header: DTYPES[name] for header, name in wanted.items() if name in DTYPES},
+    }
+
+
+def probe(source, engine=None, name=None):
+    """Read only the header row of an export and resolve it (see resolve).
+
+    `source` is a path or an open pd.ExcelFile; `name` labels errors.
+    """
+    headers = pd.read_excel(source, nrows=0, engine=engine).columns.tolist()
+    return resolve(headers, source=str(name or source))
@@ -0,0 +1,91 @@
+from copy import copy
+
+from openpyxl.cell import Cell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import range_boundaries
+
+from layout import DATE_FORMAT
+
+# Names of the report's cell styles. A cell takes one of these with a single
+# `cell.style = ...` assignment instead of setting font/fill/border/alignment
+# one by one, and the workbook stores each combination once in styles.xml.
+TITLE = "Report Title"
+HEADER = "Report Header"
+BODY = "Report Body"
+BODY_CENTERED = "Report Body Centered"
+CENTERED = "Report Centered"
+TOTAL = "Report Total"
+DATE = "Report Date"
+
+header_fill = PatternFill(start_color="ADD8E6", end_color="ADD8E6", fill_type="solid")
+
+thin_border = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+
+header_alignment = Alignment(horizontal="center", vertical="center")
+center_bottom_align = Alignment(horizontal="center", vertical="bottom")
+
+
+def report_styles():
+    # NamedStyle's own defaults are bare <font/> and <border/> elements, so
+    # spell out the workbook defaults wherever a style leaves them unchanged.
+    return [
+        NamedStyle(TITLE, font=Font(bold=True, size=14), border=DEFAULT_BORDER),
+        NamedStyle(HEADER, font=Font(bold=True), fill=header_fill,
+                   border=thin_border, alignment=header_alignment),
+        NamedStyle(BODY, font=DEFAULT_FONT, border=thin_border),
+        NamedStyle(BODY_CENTERED, font=DEFAULT_FONT, border=thin_border,
+                   alignment=center_bottom_align),
+        NamedStyle(CENTERED, font=DEFAULT_FONT, border=DEFAULT_BORDER,
+                   alignment=center_bottom_align),
+        NamedStyle(TOTAL, font=Font(bold=True), border=DEFAULT_BORDER),
+        NamedStyle(DATE, font=DEFAULT_FONT, border=DEFAULT_BORDER, number_format=DATE_FORMAT),
+    ]
+
+
+class StyleRegistry:
+    """The report's named styles, registered once on a (normal or write-only) workbook."""
+
+    def __init__(self, wb):
+        for style in report_styles():
+            if style.name not in wb.named_styles:
+                wb.add_named_style(style)
+        # `cell.style = name` looks the name up in the workbook on every
+        # assignment; keep each style's resolved StyleArray instead.
+        self._arrays = {name: wb._named_styles[name].as_tuple() for name in wb.named_styles}
+        # Reserve the cell formats up front and in a fixed order, so a style
+        # gets the same s="..." id in every workbook (sheets rendered in
+        # separate workbooks can then be moved between packages).
+        for style in report_styles():
+            wb._cell_styles.add(self._arrays[style.name])
+
+    def apply(self, cell, name):
+        cell._style = copy(self._arrays[name])
+        return cell
+
+    def fill(self, ws, first_row, first_col, columns, names):
+        """Write column sequences as a block of styled cells on a normal worksheet.
+
+        Column i of the block takes the named style names[i]. The cells are
+        built directly with their StyleArray instead of going through
+        ws.cell() and apply() once per cell.
+        """
+        arrays = [self._arrays[name] for name in names]
+        cells = ws._cells
+        for r, row in enumerate(zip(*columns), start=first_row):
+            for c, (value, array) in enumerate(zip(row, arrays), start=first_col):
+                cells[(r, c)] = Cell(ws, row=r, column=c, value=value, style_array=array)
+
+    def apply_range(self, ws, cell_range, name):
+        """Give every cell in an A1 range (e.g. "B5:G40") the same named style."""
+        min_col, min_row, max_col, max_row = range_boundaries(cell_range)
+        for row in ws.iter_rows(min_row=min_row, max_row=max_row,
+                                min_col=min_col, max_col=max_col):
+            for cell in row:
+                self.apply(cell, name)
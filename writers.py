@@ -0,0 +1,375 @@
+import math
+from abc import ABC, abstractmethod
+from datetime import date
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+import styles
+from layout import (
+    ACCOUNT_CENTERED, ACCOUNT_HEADERS, ACCOUNT_TOTALS, AGEING_COL, AS_OF_COL, AS_OF_LABEL,
+    AS_OF_ROW, DATE_COL, DATE_FORMAT, MOVEMENT_CENTERED, SUMMARY_CENTERED, SUMMARY_COLUMNS,
+    account_columns, account_totals, account_widths, live_ageing_columns, live_bucket_columns,
+    movement_tables, movement_widths, summary_layout, summary_title, summary_title_formula,
+    summary_widths,
+)
+
+
+def set_column_widths(ws, widths):
+    for col, width in widths.items():
+        ws.column_dimensions[get_column_letter(col)].width = width
+
+
+# Cell style of each styled account-sheet column (the others are left plain)
+ACCOUNT_STYLES = {**{col: styles.CENTERED for col in ACCOUNT_CENTERED}, DATE_COL: styles.DATE}
+
+
+def summary_styles(count):
+    # Cell style of each of the `count` summary columns, from column B on
+    return [styles.BODY_CENTERED if col in SUMMARY_CENTERED else styles.BODY
+            for col in range(2, count + 2)]
+
+
+def movement_styles(names, bordered):
+    # The net changes are bordered like the Summary; the items are plain like
+    # account sheets, with dates formatted
+    if bordered:
+        return [styles.BODY_CENTERED if name in MOVEMENT_CENTERED else styles.BODY for name in names]
+    return [styles.DATE if name == "Document_Date" else
+            styles.CENTERED if name in MOVEMENT_CENTERED else None for name in names]
+
+
+def summary_values(sums, names, ageing="static"):
+    """The summary lines as plain Python lists, one per column (no per-row Series).
+
+    In the live ageing modes the bucket columns are formulas over the
+    account sheets (see layout.live_bucket_columns).
+    """
+    columns = [sums[name].tolist() for name in names]
+    return columns if ageing == "static" else live_bucket_columns(sums, columns)
+
+
+def write_summary(ws, sums, today_str, registry, ageing="static", as_of=None):
+    ws.title = "Summary"
+    ws.sheet_view.showGridLines = False
+
+    # Title
+    title = summary_title(today_str)
+    value = title if ageing == "static" else summary_title_formula(ageing)
+    registry.apply(ws.cell(row=2, column=2, value=value), styles.TITLE)
+    if ageing == "as-of":
+        registry.apply(ws.cell(row=AS_OF_ROW, column=AS_OF_COL - 1, value=AS_OF_LABEL), styles.TOTAL)
+        registry.apply(ws.cell(row=AS_OF_ROW, column=AS_OF_COL, value=as_of), styles.DATE)
+
+    # Headers
+    headers, names = summary_layout(sums)
+    for col, header in enumerate(headers, start=2):
+        ws.cell(row=4, column=col, value=header)
+    registry.apply_range(ws, f"B4:{get_column_letter(len(headers) + 1)}4", styles.HEADER)
+
+    #  data to summary from row 5 on, bordered; Company and both currencies also centered
+    registry.fill(ws, 5, 2, summary_values(sums, names, ageing), summary_styles(len(headers)))
+
+    set_column_widths(ws, summary_widths(sums, title))
+
+
+def write_movements(ws, net, items, title, registry):
+    ws.sheet_view.showGridLines = False
+    registry.apply(ws.cell(row=2, column=2, value=title), styles.TITLE)
+
+    tables = movement_tables(net, items)
+    for bordered, (row, headers, names, columns) in zip((True, False), tables):
+        for col, header in enumerate(headers, start=2):
+            ws.cell(row=row, column=col, value=header)
+        registry.apply_range(ws, f"B{row}:{get_column_letter(len(headers) + 1)}{row}", styles.HEADER)
+        body = movement_styles(names, bordered)
+        for r, values in enumerate(zip(*columns), start=row + 1):
+            for col, (value, style) in enumerate(zip(values, body), start=2):
+                cell = ws.cell(row=r, column=col, value=value)
+                if style:
+                    registry.apply(cell, style)
+
+    set_column_widths(ws, movement_widths(tables, title))
+
+
+def write_account_sheet(ws, account_df, registry, ageing="static", lengths=None):
+    # Header row formatting
+    for col, header in enumerate(ACCOUNT_HEADERS, start=1):
+        ws.cell(row=1, column=col, value=header)
+    registry.apply_range(ws, f"A1:{get_column_letter(len(ACCOUNT_HEADERS))}1", styles.HEADER)
+
+    # Data rows
+    columns = account_columns(account_df)
+    cells = columns if ageing == "static" else live_ageing_columns(account_df, columns, ageing)
+    for idx, row in enumerate(zip(*cells), start=2):
+        for col, value in enumerate(row, start=1):
+            cell = ws.cell(row=idx, column=col, value=value)
+            style = ACCOUNT_STYLES.get(col)
+            if style:
+                registry.apply(cell, style)
+
+    # Totals row
+    total_row = len(account_df) + 2
+    totals = account_totals(account_df)
+    for col, total in totals.items():
+        registry.apply(ws.cell(row=total_row, column=col, value=total), styles.TOTAL)
+
+    set_column_widths(ws, account_widths(columns, totals, lengths))
+
+
+# Streaming (write-only) output: rows are appended once and flushed to disk,
+# so nothing can be read back and widths have to be known up front.
+
+def header_cells(ws, headers, registry):
+    return [registry.apply(WriteOnlyCell(ws, header), styles.HEADER) for header in headers]
+
+
+def stream_summary(wb, sums, today_str, registry, ageing="static", as_of=None):
+    ws = wb.create_sheet("Summary")
+    ws.sheet_view.showGridLines = False
+
+    title = summary_title(today_str)
+    headers, names = summary_layout(sums)
+    set_column_widths(ws, summary_widths(sums, title))
+
+    value = title if ageing == "static" else summary_title_formula(ageing)
+    ws.append([])
+    ws.append([None, registry.apply(WriteOnlyCell(ws, value), styles.TITLE)])
+    if ageing == "as-of":
+        ws.append([None] * (AS_OF_COL - 2) + [
+            registry.apply(WriteOnlyCell(ws, AS_OF_LABEL), styles.TOTAL),
+            registry.apply(WriteOnlyCell(ws, as_of), styles.DATE),
+        ])
+    else:
+        ws.append([])
+    ws.append([None] + header_cells(ws, headers, registry))
+
+    body = summary_styles(len(headers))
+    for row in zip(*summary_values(sums, names, ageing)):
+        ws.append([None] + [registry.apply(WriteOnlyCell(ws, value), style)
+                            for value, style in zip(row, body)])
+
+
+def stream_movements(wb, net, items, title, registry):
+    ws = wb.create_sheet("Movements")
+    ws.sheet_view.showGridLines = False
+
+    tables = movement_tables(net, items)
+    set_column_widths(ws, movement_widths(tables, title))
+
+    ws.append([])
+    ws.append([None, registry.apply(WriteOnlyCell(ws, title), styles.TITLE)])
+    last_row = 2
+    for bordered, (row, headers, names, columns) in zip((True, False), tables):
+        for _ in range(row - 1 - last_row):
+            ws.append([])
+        ws.append([None] + header_cells(ws, headers, registry))
+        body = movement_styles(names, bordered)
+        for values in zip(*columns):
+            ws.append([None] + [registry.apply(WriteOnlyCell(ws, value), style) if style else value
+                                for value, style in zip(values, body)])
+        last_row = row + len(columns[0])
+
+
+def stream_account_sheet(wb, account, account_df, registry, ageing="static", lengths=None):
+    ws = wb.create_sheet(title=str(account))
+
+    columns = account_columns(account_df)
+    totals = account_totals(account_df)
+    set_column_widths(ws, account_widths(columns, totals, lengths))
+
+    ws.append(header_cells(ws, ACCOUNT_HEADERS, registry))
+
+    cells = columns if ageing == "static" else live_ageing_columns(account_df, columns, ageing)
+    for row in zip(*cells):
+        ws.append([
+            registry.apply(WriteOnlyCell(ws, value), ACCOUNT_STYLES[col]) if col in ACCOUNT_STYLES else value
+            for col, value in enumerate(row, start=1)
+        ])
+
+    ws.append([
+        registry.apply(WriteOnlyCell(ws, totals[col]), styles.TOTAL) if col in totals else None
+        for col in range(1, max(ACCOUNT_TOTALS) + 1)
+    ])
+
+
+class ReportWriter(ABC):
+    """Output backend: write_summary once, write_account per account, then close.
+
+    `ageing` is one of layout.AGEING_MODES; the "as-of" mode writes `as_of`
+    into the Summary sheet for the ageing formulas to refer to. write_account
+    may be given the sheet's text lengths (layout.account_text_lengths) so
+    its widths need not be measured again. A backend that leaves out any of
+    the abstract methods fails when it is created, not halfway through a
+    report.
+    """
+
+    def __init__(self, output_file, ageing="static", as_of=None):
+        self.output_file = output_file
+        self.ageing = ageing
+        self.as_of = as_of
+
+    @abstractmethod
+    def write_summary(self, sums, today_str):
+        ...
+
+    @abstractmethod
+    def write_account(self, account, account_df, lengths=None):
+        ...
+
+    @abstractmethod
+    def write_movements(self, net, items, title):
+        """The Movements sheet (see movements.compare_exports), right after the Summary."""
+
+    @abstractmethod
+    def close(self):
+        ...
+
+
+class OpenpyxlWriter(ReportWriter):
+
+    def __init__(self, output_file, streaming=False, ageing="static", as_of=None):
+        super().__init__(output_file, ageing, as_of)
+        self.streaming = streaming
+        self.wb = openpyxl.Workbook(write_only=streaming)
+        self.registry = styles.StyleRegistry(self.wb)
+
+    def write_summary(self, sums, today_str):
+        if self.streaming:
+            stream_summary(self.wb, sums, today_str, self.registry, self.ageing, self.as_of)
+        else:
+            write_summary(self.wb.active, sums, today_str, self.registry, self.ageing, self.as_of)
+
+    def write_movements(self, net, items, title):
+        if self.streaming:
+            stream_movements(self.wb, net, items, title, self.registry)
+        else:
+            write_movements(self.wb.create_sheet("Movements"), net, items, title, self.registry)
+
+    def write_account(self, account, account_df, lengths=None):
+        if self.streaming:
+            stream_account_sheet(self.wb, account, account_df, self.registry, self.ageing, lengths)
+        else:
+            write_account_sheet(self.wb.create_sheet(title=str(account)), account_df,
+                                self.registry, self.ageing, lengths)
+
+    def close(self):
+        self.wb.save(self.output_file)
+
+
+class XlsxWriterWriter(ReportWriter):
+    """xlsxwriter in constant_memory mode: rows are flushed as soon as the next one starts."""
+
+    def __init__(self, output_file, streaming=True, ageing="static", as_of=None):
+        try:
+            import xlsxwriter
+        except ImportError:
+            raise ImportError("the xlsxwriter backend needs the xlsxwriter package "
+                              "(pip install xlsxwriter)") from None
+        super().__init__(output_file, ageing, as_of)
+        self.wb = xlsxwriter.Workbook(output_file, {"constant_memory": True})
+        # One Format per report style, created once and shared by every cell
+        header = {"bold": True, "bg_color": "#ADD8E6", "border": 1,
+                  "align": "center", "valign": "vcenter"}
+        centered = {"align": "center", "valign": "bottom"}
+        self.formats = {
+            styles.TITLE: self.wb.add_format({"bold": True, "font_size": 14}),
+            styles.HEADER: self.wb.add_format(header),
+            styles.BODY: self.wb.add_format({"border": 1}),
+            styles.BODY_CENTERED: self.wb.add_format({"border": 1, **centered}),
+            styles.CENTERED: self.wb.add_format(centered),
+            styles.TOTAL: self.wb.add_format({"bold": True}),
+            styles.DATE: self.wb.add_format({"num_format": DATE_FORMAT}),
+        }
+
+    def _write(self, ws, row, col, value, style=None):
+        # row/col are 1-based like the rest of the report code
+        fmt = self.formats[style] if style else None
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            if fmt is not None:
+                ws.write_blank(row - 1, col - 1, None, fmt)
+        elif isinstance(value, date):
+            ws.write_datetime(row - 1, col - 1, value, fmt)
+        elif isinstance(value, str):
+            ws.write_string(row - 1, col - 1, value, fmt)
+        else:
+            ws.write_number(row - 1, col - 1, value, fmt)
+
+    def _set_column_widths(self, ws, widths):
+        for col, width in widths.items():
+            ws.set_column(col - 1, col - 1, width)
+
+    def write_summary(self, sums, today_str):
+        ws = self.wb.add_worksheet("Summary")
+        ws.hide_gridlines(2)
+
+        title = summary_title(today_str)
+        self._set_column_widths(ws, summary_widths(sums, title))
+        if self.ageing == "static":
+            self._write(ws, 2, 2, title, styles.TITLE)
+        else:
+            ws.write_formula(1, 1, summary_title_formula(self.ageing), self.formats[styles.TITLE])
+        if self.ageing == "as-of":
+            self._write(ws, AS_OF_ROW, AS_OF_COL - 1, AS_OF_LABEL, styles.TOTAL)
+            self._write(ws, AS_OF_ROW, AS_OF_COL, self.as_of, styles.DATE)
+        headers, names = summary_layout(sums)
+        for col, header in enumerate(headers, start=2):
+            self._write(ws, 4, col, header, styles.HEADER)
+
+        body = summary_styles(len(headers))
+        live = self.ageing != "static"
+        for r, row in enumerate(zip(*summary_values(sums, names, self.ageing)), start=5):
+            for col, (value, style) in enumerate(zip(row, body), start=2):
+                if live and col > len(SUMMARY_COLUMNS) + 1:
+                    ws.write_formula(r - 1, col - 1, value, self.formats[style])
+                else:
+                    self._write(ws, r, col, value, style)
+
+    def write_movements(self, net, items, title):
+        ws = self.wb.add_worksheet("Movements")
+        ws.hide_gridlines(2)
+
+        tables = movement_tables(net, items)
+        self._set_column_widths(ws, movement_widths(tables, title))
+        self._write(ws, 2, 2, title, styles.TITLE)
+        for bordered, (row, headers, names, columns) in zip((True, False), tables):
+            for col, header in enumerate(headers, start=2):
+                self._write(ws, row, col, header, styles.HEADER)
+            body = movement_styles(names, bordered)
+            for r, values in enumerate(zip(*columns), start=row + 1):
+                for col, (value, style) in enumerate(zip(values, body), start=2):
+                    self._write(ws, r, col, value, style)
+
+    def write_account(self, account, account_df, lengths=None):
+        ws = self.wb.add_worksheet(str(account))
+
+        columns = account_columns(account_df)
+        totals = account_totals(account_df)
+        self._set_column_widths(ws, account_widths(columns, totals, lengths))
+
+        for col, header in enumerate(ACCOUNT_HEADERS, start=1):
+            self._write(ws, 1, col, header, styles.HEADER)
+
+        live = self.ageing != "static"
+        cells = live_ageing_columns(account_df, columns, self.ageing) if live else columns
+        for idx, row in enumerate(zip(*cells), start=2):
+            for col, value in enumerate(row, start=1):
+                style = ACCOUNT_STYLES.get(col)
+                if live and col == AGEING_COL and value is not None:
+                    ws.write_formula(idx - 1, col - 1, value, self.formats[style])
+                else:
+                    self._write(ws, idx, col, value, style)
+
+        total_row = len(account_df) + 2
+        for col, total in totals.items():
+            self._write(ws, total_row, col, total, styles.TOTAL)
+
+    def close(self):
+        self.wb.close()
+
+
+WRITERS = {
+    "openpyxl": OpenpyxlWriter,
+    "xlsxwriter": XlsxWriterWriter,
+}